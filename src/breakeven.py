@@ -0,0 +1,179 @@
+"""
+Break-even values of the inputs, e.g. the maximal system cost, the minimal feed-in tarif or the minimal
+self-consumption rate at which the NPV is zero (or the IRR reaches a target).
+
+Within a tax regime the NPV is linear in system_cost, subsidy, electricity_rate, feed_in_tarif,
+self_consumption_rate, annual_electricity_production and tax_rate (see src.sensitivities), so one step with the
+closed-form gradient gives the exact break-even value. If the taxation switches on the way (self_consumption_rate,
+annual_electricity_production), the step is checked with the model and a vectorized bisection within BOUNDS is used
+instead. The IRR reaches a target exactly where the NPV at interest_rate = target is zero, so IRR targets are solved
+the same way. All functions solve many scenarios at once (inputs are broadcast like in
+calculate_solar_pv_economics_batch). Scenarios with lifetime inputs (see src.lifetime) are solved by bisection of
+simulate_lifetime_batch.
+"""
+import numpy as np
+
+from .functions import calculate_solar_pv_economics_batch
+from .lifetime import simulate_lifetime_batch
+
+
+# inputs which can be solved for and the search interval of the bisection
+BOUNDS = {
+    "system_cost": (0., 1e7),
+    "subsidy": (0., 1e7),
+    "annual_electricity_production": (0., 1e7),
+    "electricity_rate": (0., 10.),
+    "feed_in_tarif": (-1., 10.),
+    "self_consumption_rate": (0., 1.),
+    "tax_rate": (0., 1.),
+    "interest_rate": (-0.9, 10.),
+    "depreciation_period": (1, 50),
+}
+
+# break-even values shown in the app
+BREAK_EVEN_INPUTS = ("system_cost", "feed_in_tarif", "self_consumption_rate")
+
+
+def _batch(inputs, lifetime=None):
+    if lifetime:
+        return simulate_lifetime_batch(inputs, **lifetime)
+    return calculate_solar_pv_economics_batch(**inputs)
+
+
+def _npv(inputs, name, value, lifetime=None):
+    return _batch({**inputs, name: value}, lifetime)["npv"]
+
+
+def _shape(inputs):
+    return np.broadcast(*[np.asarray(v) for k, v in inputs.items()
+                          if k not in ("depreciation_period", "resolution")]).shape
+
+
+def _bisect(inputs, name, lower, upper, iterations, lifetime=None):
+    """Vectorized bisection of the NPV in [lower, upper] (NaN where the sign does not change)."""
+    shape = _shape(inputs)
+    lower = np.full(shape, lower, dtype=np.float64)
+    upper = np.full(shape, upper, dtype=np.float64)
+    npv_lower = _npv(inputs, name, lower, lifetime)
+    npv_upper = _npv(inputs, name, upper, lifetime)
+    valid = np.sign(npv_lower) != np.sign(npv_upper)
+
+    for _ in range(iterations):
+        middle = (lower + upper) / 2
+        npv_middle = _npv(inputs, name, middle, lifetime)
+        same_sign = np.sign(npv_middle) == np.sign(npv_lower)
+        lower = np.where(same_sign, middle, lower)
+        npv_lower = np.where(same_sign, npv_middle, npv_lower)
+        upper = np.where(same_sign, upper, middle)
+
+    return np.where(valid, (lower + upper) / 2, np.nan)
+
+
+def _depreciation_period(inputs, lower, upper, lifetime=None):
+    """Shortest depreciation period (integer) with a non-negative NPV (NaN if there is none up to upper)."""
+    result = np.nan
+    for period in range(upper, lower - 1, -1):
+        npv = _npv(inputs, "depreciation_period", period, lifetime)
+        result = np.where(npv >= 0, period, result)
+    return result
+
+
+def _prepare(inputs, name, irr):
+    """Inputs of the batch function (the IRR target as interest rate)."""
+    if name not in BOUNDS:
+        raise ValueError("Break-even of {} not supported (choose one of {})".format(name, ", ".join(BOUNDS)))
+    # the start year only sets the dates of the periods
+    inputs = {k: v for k, v in inputs.items() if k not in ("sensitivities", "start_year")}
+    if irr is not None:
+        if name == "interest_rate":
+            raise ValueError("The IRR can not be a target for the interest rate")
+        inputs["interest_rate"] = irr
+    return inputs
+
+
+def break_even(inputs, name, irr=None, iterations=60, lifetime=None):
+    """
+    Value of the input name at which the NPV is zero (or the IRR is equal to irr), all other inputs unchanged.
+
+    Args:
+        inputs: dict with the inputs of calculate_solar_pv_economics_batch (scalars or arrays)
+        name: input to solve for (see BOUNDS)
+        irr: target IRR as a decimal (default None, i.e. NPV = 0 at the interest rate of the inputs)
+        iterations: number of iterations of the bisection
+        lifetime: dict with the lifetime inputs (see src.lifetime.lifetime_factors) or None
+
+    Returns:
+        array with the break-even values (NaN if there is none within BOUNDS); for the depreciation period the
+        shortest period in years with a non-negative NPV
+    """
+    inputs = _prepare(inputs, name, irr)
+    lower, upper = BOUNDS[name]
+
+    if name == "depreciation_period":
+        return _depreciation_period(inputs, lower, upper, lifetime)
+    if name == "interest_rate":
+        return _batch(inputs, lifetime)["irr"]
+
+    # the closed-form gradient is only available for constant inputs in yearly resolution
+    if lifetime or (inputs.get("resolution", "1Y") != "1Y"):
+        return _bisect(inputs, name, lower, upper, iterations, lifetime)
+
+    # one step with the gradient is exact if the tax regime does not change
+    batch = calculate_solar_pv_economics_batch(**inputs, sensitivities=True)
+    slope = batch["sensitivities"]["npv"][name]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        step = np.asarray(inputs[name], dtype=np.float64) - batch["npv"] / slope
+    step = np.where(np.isfinite(step) & (step >= lower) & (step <= upper), step, (lower + upper) / 2)
+    exact = np.isclose(_npv(inputs, name, step), 0., atol=1e-6 * (1 + np.abs(batch["npv"])))
+    if np.all(exact):
+        return step
+    return np.where(exact, step, _bisect(inputs, name, lower, upper, iterations))
+
+
+def break_even_limit(inputs, name, irr=None, lifetime=None):
+    """
+    Limit of the input name up to which the NPV is non-negative (or the IRR reaches irr), all other inputs unchanged.
+
+    The limit is a maximum if the NPV falls with the input (e.g. the system cost) and a minimum if it rises (e.g. the
+    feed-in tarif). The self-consumption rate can be both: it is a maximum if the electricity rate is lower than the
+    feed-in tarif after taxes.
+
+    Returns:
+        tuple: array with the limit (the break-even value, the bound of BOUNDS if the NPV is non-negative within all of
+        BOUNDS, NaN if it is negative within all of BOUNDS) and bool array whether the limit is a maximum
+    """
+    if name == "interest_rate":
+        return break_even(inputs, name, irr, lifetime=lifetime), np.full(_shape(inputs), True)
+    if name == "depreciation_period":
+        return break_even(inputs, name, irr, lifetime=lifetime), np.full(_shape(inputs), False)
+
+    value = break_even(inputs, name, irr, lifetime=lifetime)
+    prepared = _prepare(inputs, name, irr)
+    lower, upper = BOUNDS[name]
+    npv_lower = _npv(prepared, name, np.full(_shape(prepared), lower, dtype=np.float64), lifetime)
+    npv_upper = _npv(prepared, name, np.full(_shape(prepared), upper, dtype=np.float64), lifetime)
+    maximum = npv_upper < npv_lower
+
+    always = (npv_lower >= 0) & (npv_upper >= 0)
+    value = np.where(always, np.where(maximum, upper, lower), value)
+    return value, maximum
+
+
+def break_even_values(inputs, names=BREAK_EVEN_INPUTS, irr=None, lifetime=None):
+    """
+    Break-even values of several inputs (see break_even).
+
+    Returns:
+        dict with the break-even value of each input
+    """
+    return {name: break_even(inputs, name, irr, lifetime=lifetime) for name in names}
+
+
+def break_even_limits(inputs, names=BREAK_EVEN_INPUTS, irr=None, lifetime=None):
+    """
+    Limits of several inputs (see break_even_limit).
+
+    Returns:
+        dict with a tuple of the limit and whether it is a maximum for each input
+    """
+    return {name: break_even_limit(inputs, name, irr, lifetime) for name in names}
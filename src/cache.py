@@ -0,0 +1,271 @@
+"""
+Cache subsystem with two tiers.
+
+Resource tier: immutable objects which are expensive to create (e.g. the parsed settings/plotting.yml or the plotly
+template) are created once per process and shared by all sessions (see resource and load_settings). Cached mappings
+and lists are frozen, so a session can not change them for the others.
+
+Disk tier: computed results and rendered figures are pickled to a local directory and survive restarts of the server
+(see DiskCache). The cache has a size limit with LRU eviction and a time to live. Files are written atomically (temp
+file and rename) and writes and evictions hold a file lock, so several server processes can share the directory.
+
+The disk tier is configured with the environment variables PV_CALCULATOR_CACHE_DIR (default "cache"),
+PV_CALCULATOR_CACHE_SIZE (in MB, default 500, 0 disables the disk tier) and PV_CALCULATOR_CACHE_TTL (in hours,
+default 720).
+"""
+import functools
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+import types
+from warnings import warn
+
+import yaml
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# part of every key of the disk tier, increase if the pickled objects change incompatibly
+CACHE_VERSION = 5
+
+
+def _freeze(obj):
+    """Read-only copy of nested dicts and lists."""
+    if isinstance(obj, dict):
+        return types.MappingProxyType({k: _freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(_freeze(v) for v in obj)
+    return obj
+
+
+def resource(func):
+    """
+    Decorator caching the result of func once per process and arguments (thread-safe, func is called only once).
+    The result is shared by all sessions and must not be changed.
+    """
+    results = {}
+    lock = threading.Lock()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        try:
+            return results[key]
+        except KeyError:
+            pass
+        with lock:
+            if key not in results:
+                results[key] = func(*args, **kwargs)
+            return results[key]
+
+    wrapper.clear = results.clear
+    return wrapper
+
+
+@resource
+def load_settings(path="settings/plotting.yml"):
+    """
+    Parsed yaml settings (e.g. settings/plotting.yml with the colors map), loaded once per process.
+
+    Returns:
+        read-only mapping
+    """
+    with open(path, mode="r", encoding="utf8") as file:
+        return _freeze(yaml.load(file, Loader=yaml.FullLoader))
+
+
+class _FileLock(object):
+    """Exclusive lock of a file, shared between processes (and threads of one process)."""
+
+    _thread_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            self.file = open(self.path, mode="a+b")
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            else:
+                self.file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:  # LK_LOCK gives up after 10 s
+                        pass
+        except BaseException:
+            if self.file is not None:
+                self.file.close()
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            else:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.file.close()
+            self._thread_lock.release()
+
+
+class DiskCache(object):
+    """
+    Persistent cache of picklable values in a local directory, one file per key.
+
+    The modification time of a file is the time it was written (for the time to live), the access time is set on
+    every hit and gives the order of the LRU eviction. Errors of the file system (e.g. a read-only directory) are
+    reported as warning and the value is simply not cached.
+    """
+
+    SUFFIX = ".pkl"
+
+    def __init__(self, path, max_size=500 * 2 ** 20, ttl=30 * 24 * 3600., version=CACHE_VERSION):
+        """
+        Args:
+            path: directory of the cache (created on the first write)
+            max_size: maximal size of all files in bytes (0 disables the cache)
+            ttl: time to live of an entry in seconds (None for no limit)
+            version: part of every key, entries of other versions are not used
+        """
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = version
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def _file(self, key):
+        digest = hashlib.sha256(pickle.dumps((self.version, key), protocol=4)).hexdigest()
+        return os.path.join(self.path, digest + self.SUFFIX)
+
+    def _lock(self):
+        return _FileLock(os.path.join(self.path, ".lock"))
+
+    def _expired(self, stat, now):
+        return (self.ttl is not None) and (now - stat.st_mtime > self.ttl)
+
+    def get(self, key, default=None):
+        """Value of key or default if it is not cached (or expired)."""
+        if not self.enabled:
+            return default
+        file = self._file(key)
+        now = time.time()
+        try:
+            stat = os.stat(file)
+            if self._expired(stat, now):
+                self._remove(file)
+                return default
+            with open(file, mode="rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return default
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            # unreadable entry, e.g. written by an incompatible version of the code
+            warn("Cache entry {} could not be read: {}".format(file, e))
+            self._remove(file)
+            return default
+        try:
+            os.utime(file, (now, stat.st_mtime))
+        except OSError:  # removed by another process in the meantime
+            pass
+        return value
+
+    def set(self, key, value):
+        """Store value for key and evict the least recently used entries if the cache is too large."""
+        if not self.enabled:
+            return
+        file = self._file(key)
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            os.makedirs(self.path, exist_ok=True)
+            with self._lock():
+                fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, mode="wb") as f:
+                        f.write(data)
+                    os.replace(tmp, file)
+                except BaseException:
+                    self._remove(tmp)
+                    raise
+                self._evict()
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            warn("Value could not be cached in {}: {}".format(self.path, e))
+
+    def _remove(self, file):
+        try:
+            os.remove(file)
+        except OSError:
+            pass
+
+    def _entries(self):
+        with os.scandir(self.path) as it:
+            return [(entry.path, entry.stat()) for entry in it if entry.name.endswith(self.SUFFIX)]
+
+    def _evict(self):
+        """Remove expired entries and the least recently used ones above max_size (holding the lock)."""
+        now = time.time()
+        entries = []
+        for file, stat in self._entries():
+            if self._expired(stat, now):
+                self._remove(file)
+            else:
+                entries.append((stat.st_atime, stat.st_size, file))
+        size = sum(s for _, s, _ in entries)
+        for _, s, file in sorted(entries):
+            if size <= self.max_size:
+                break
+            self._remove(file)
+            size -= s
+
+    def clear(self):
+        """Remove all entries."""
+        if not os.path.isdir(self.path):
+            return
+        with self._lock():
+            for file, _ in self._entries():
+                self._remove(file)
+
+    def memoize(self, namespace):
+        """
+        Decorator caching the results of a function on disk by its (picklable) arguments.
+
+        Args:
+            namespace: name of the function in the keys, change it if the results of the function change
+        """
+        def decorator(func):
+            missing = object()
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = (namespace, args, tuple(sorted(kwargs.items())))
+                value = self.get(key, missing)
+                if value is missing:
+                    value = func(*args, **kwargs)
+                    self.set(key, value)
+                return value
+            return wrapper
+        return decorator
+
+
+disk_cache = DiskCache(
+    path=os.environ.get("PV_CALCULATOR_CACHE_DIR", "cache"),
+    max_size=int(float(os.environ.get("PV_CALCULATOR_CACHE_SIZE", 500)) * 2 ** 20),
+    ttl=float(os.environ.get("PV_CALCULATOR_CACHE_TTL", 720)) * 3600,
+)
@@ -1,7 +1,22 @@
+import numpy as np
 import pandas as pd
-import numpy_financial as npf
 import streamlit as st
-from .utils import fig_and_link
+from functools import lru_cache
+from .utils import fig_and_link, make_fig
+from .cache import disk_cache
+from .kpi import calculate_kpis, periodic_bracket, KPIS
+from .sensitivities import calculate_sensitivities
+from .roof import economics_inputs as economics_inputs_of_roofs
+from .results import EconomicsResult, CASH_FLOW_COLUMNS, INVESTMENT, TAX, SAVINGS, FEEDIN, SUBSIDY, \
+    PERIODS_PER_YEAR
+
+
+# pandas frequency of the period starts in quarterly and monthly resolution
+PERIOD_FREQUENCIES = {"1Q": "QS", "1M": "MS"}
+RESOLUTION_LABELS = {"1Y": "Jährlich", "1Q": "Quartalsweise", "1M": "Monatlich"}
+
+# typical share of the yearly PV production per month (January to December, Central Europe)
+PRODUCTION_SEASONALITY = np.array([0.035, 0.045, 0.08, 0.105, 0.125, 0.13, 0.135, 0.12, 0.09, 0.07, 0.035, 0.03])
 
 
 def get_color_pre_and_post_str(color):
@@ -11,39 +26,67 @@ def get_color_pre_and_post_str(color):
         return "", ""
 
 
-def get_technical_inputs(col, color=None):
+def get_technical_inputs(col, color=None, key="0"):
 
     color_pre_str, color_post_str = get_color_pre_and_post_str(color)
 
     with col:
-        pv_power = st.number_input(
-            label=color_pre_str+"Größe der PV Anlage in kW"+color_post_str,
-            value=10,
-            key=col
+        multi_array = st.checkbox(
+            label=color_pre_str+"Mehrere Teilanlagen (z.B. Ost-West-Dach)"+color_post_str,
+            value=False,
+            key="{}_multi_array".format(key)
         )
 
+        if not multi_array:
+            pv_power = st.number_input(
+                label=color_pre_str+"Größe der PV Anlage in kW"+color_post_str,
+                value=10,
+                key="{}_pv_power".format(key)
+            )
+        else:
+            installation = get_sub_array_inputs(color, key)
+
         annual_fullload_hours = st.number_input(
             label=color_pre_str+"Jährliche Volllaststunden in h " + color_post_str +""" (*Maßgeblicher Parameter für die jährliche Produktionsmenge, 
             welche sich aus dem Produkt aus Volllaststunden und Größe der PV Anlage ergibt (h * kW = kWh).*)""",
             value=1000,
-            key=col
+            key="{}_annual_fullload_hours".format(key)
         )
 
-        annual_electricity_production = annual_fullload_hours * pv_power
-
-        st.write("➡ Jährliche Produktionsmenge {:,.2f} kWh".format(annual_electricity_production))
+        if not multi_array:
+            annual_electricity_production = annual_fullload_hours * pv_power
+
+            st.write("➡ Jährliche Produktionsmenge {:,.2f} kWh".format(annual_electricity_production))
+
+            # annual_power_consumption = st.number_input(
+            #     label="Eigener Stromverbrauch in kWh",
+            #     value=2000,
+            #     key="{}_annual_power_consumption".format(key)
+            # )
+
+            self_consumption_rate = st.number_input(
+                label=color_pre_str+"Eigenverbrauchsgrad in %"+color_post_str,
+                value=10,
+                key="{}_self_consumption_rate".format(key)
+            ) / 100
+        else:
+            annual_power_consumption = st.number_input(
+                label=color_pre_str+"Eigener Stromverbrauch in kWh"+color_post_str,
+                value=4000,
+                key="{}_annual_power_consumption".format(key)
+            )
 
-        # annual_power_consumption = st.number_input(
-        #     label="Eigener Stromverbrauch in kWh",
-        #     value=2000,
-        #     key=col
-        # )
+            # hourly profiles of all sub-arrays (see src.roof), the full load hours are those of a south facing
+            # array with a tilt of 30°
+            roof = economics_inputs_of_roofs([installation], annual_power_consumption,
+                                             annual_fullload_hours=annual_fullload_hours)
+            pv_power = float(roof["pv_power"][0])
+            annual_electricity_production = float(roof["annual_electricity_production"][0])
+            self_consumption_rate = float(roof["self_consumption_rate"][0])
 
-        self_consumption_rate = st.number_input(
-            label=color_pre_str+"Eigenverbrauchsgrad in %"+color_post_str,
-            value=10,
-            key=col
-        ) / 100
+            st.write("➡ Größe der PV Anlage {:,.2f} kW".format(pv_power))
+            st.write("➡ Jährliche Produktionsmenge {:,.2f} kWh".format(annual_electricity_production))
+            st.write("➡ Eigenverbrauchsgrad {:,.1f} %".format(self_consumption_rate * 100))
 
     inputs = {
         "pv_power": pv_power,
@@ -56,7 +99,44 @@ def get_technical_inputs(col, color=None):
     return inputs
 
 
-def get_economic_inputs(col, color=None):
+def get_sub_array_inputs(color=None, key="0", max_sub_arrays=6):
+    """Inputs of the sub-arrays and the inverter of one installation (see src.roof)."""
+
+    color_pre_str, color_post_str = get_color_pre_and_post_str(color)
+    defaults = [(5, 90, 30), (5, 270, 30)]
+
+    n_sub_arrays = st.number_input(
+        label=color_pre_str+"Anzahl an Teilanlagen"+color_post_str,
+        min_value=1, max_value=max_sub_arrays, value=len(defaults),
+        key="{}_n_sub_arrays".format(key)
+    )
+
+    sub_arrays = []
+    for j in range(n_sub_arrays):
+        pv_power, azimuth, tilt = defaults[j] if j < len(defaults) else (5, 180, 30)
+        col1, col2, col3 = st.columns(3)
+        sub_arrays.append({
+            "pv_power": col1.number_input(
+                label="Teilanlage {} in kW".format(j + 1), value=pv_power,
+                key="{}_sub_array_{}_pv_power".format(key, j)),
+            "azimuth": col2.number_input(
+                label="Ausrichtung in ° (Ost 90, Süd 180)", min_value=0, max_value=360, value=azimuth,
+                key="{}_sub_array_{}_azimuth".format(key, j)),
+            "tilt": col3.number_input(
+                label="Neigung in °", min_value=0, max_value=90, value=tilt,
+                key="{}_sub_array_{}_tilt".format(key, j)),
+        })
+
+    inverter_power = st.number_input(
+        label=color_pre_str+"Leistung des Wechselrichters in kW (0 = ohne Begrenzung)"+color_post_str,
+        min_value=0.0, value=0.0,
+        key="{}_inverter_power".format(key)
+    )
+
+    return {"sub_arrays": sub_arrays, "inverter_power": inverter_power}
+
+
+def get_economic_inputs(col, color=None, key="0"):
 
     color_pre_str, color_post_str = get_color_pre_and_post_str(color)
 
@@ -64,39 +144,54 @@ def get_economic_inputs(col, color=None):
         system_cost = st.number_input(
                 label=color_pre_str+"Kosten der Anlage in EUR"+color_post_str,
                 value=10000,
-                key=col
+                key="{}_system_cost".format(key)
             )
 
         subsidy = st.number_input(
                 label=color_pre_str+"Förderung der Anlage in EUR"+color_post_str,
                 value=0,
-                key=col
+                key="{}_subsidy".format(key)
             )
 
         depreciation_period = st.number_input(
                 label=color_pre_str+"Abschreibedauer der Anlage in Jahren"+color_post_str,
                 value=20,
-                key=col
+                key="{}_depreciation_period".format(key)
             )
 
         electricity_rate = st.number_input(
                 label=color_pre_str+"Kosten des Netzbezugs in EUR/kWh"+color_post_str,
                 value=0.15,
-                key=col
+                key="{}_electricity_rate".format(key)
             )
 
         feed_in_tarif = st.number_input(
                 label=color_pre_str+"Einspeisetarif in EUR/kWh"+color_post_str,
                 value=0.1,
-                key=col
+                key="{}_feed_in_tarif".format(key)
             )
 
         interest_rate = st.number_input(
                 label=color_pre_str+"Zinssatz in %"+color_post_str,
                 value=5,
-                key=col
+                key="{}_interest_rate".format(key)
             )/100
 
+        resolution = st.selectbox(
+                label=color_pre_str+"Zeitliche Auflösung der Zahlungsströme"+color_post_str,
+                options=list(RESOLUTION_LABELS),
+                format_func=RESOLUTION_LABELS.get,
+                key="{}_resolution".format(key)
+            )
+
+        # the dates of quarterly and monthly periods start in January of this year
+        if resolution != "1Y":
+            start_year = st.number_input(
+                    label=color_pre_str+"Startjahr"+color_post_str,
+                    value=pd.Timestamp.today().year,
+                    key="{}_start_year".format(key)
+                )
+
     inputs = {
         "system_cost": system_cost,
         "subsidy": subsidy,
@@ -104,12 +199,15 @@ def get_economic_inputs(col, color=None):
         "electricity_rate": electricity_rate,
         "feed_in_tarif": feed_in_tarif,
         "interest_rate": interest_rate,
+        "resolution": resolution,
     }
+    if resolution != "1Y":
+        inputs["start_year"] = start_year
 
     return inputs
 
 
-def get_tax_inputs(col, color=None):
+def get_tax_inputs(col, color=None, key="0"):
 
     color_pre_str, color_post_str = get_color_pre_and_post_str(color)
 
@@ -118,19 +216,19 @@ def get_tax_inputs(col, color=None):
         tax_power_threshold = st.number_input(
                 label=color_pre_str+"Schwellenwert Leistung in kWp"+color_post_str,
                 value=25,
-                key=col
+                key="{}_tax_power_threshold".format(key)
             )
 
         tax_feedin_threshold = st.number_input(
                 label=color_pre_str+"Schwellenwert Einspeisemenge in kWh (Freibetrag)"+color_post_str,
                 value=12500,
-                key=col
+                key="{}_tax_feedin_threshold".format(key)
             )
 
         tax_rate = st.number_input(
                 label=color_pre_str+"Grenzsteuersatz in %"+color_post_str,
                 value=42,
-                key=col
+                key="{}_tax_rate".format(key)
             )/100
 
     inputs = {
@@ -142,9 +240,76 @@ def get_tax_inputs(col, color=None):
     return inputs
 
 
+def get_lifetime_inputs(col, color=None, key="0", depreciation_period=None):
+
+    color_pre_str, color_post_str = get_color_pre_and_post_str(color)
+
+    with col:
+
+        degradation = st.number_input(
+                label=color_pre_str+"Jährliche Degradation der Module in %"+color_post_str,
+                value=0.0,
+                key="{}_degradation".format(key)
+            )/100
+
+        electricity_escalation = st.number_input(
+                label=color_pre_str+"Jährliche Steigerung der Kosten des Netzbezugs in %"+color_post_str,
+                value=0.0,
+                key="{}_electricity_escalation".format(key)
+            )/100
+
+        feed_in_escalation = st.number_input(
+                label=color_pre_str+"Jährliche Steigerung des Einspeisetarifs in %"+color_post_str,
+                value=0.0,
+                key="{}_feed_in_escalation".format(key)
+            )/100
+
+        om_cost = st.number_input(
+                label=color_pre_str+"Betriebs- und Wartungskosten in EUR pro Jahr"+color_post_str,
+                value=0,
+                key="{}_om_cost".format(key)
+            )
+
+        om_escalation = st.number_input(
+                label=color_pre_str+"Jährliche Steigerung der Betriebskosten in %"+color_post_str,
+                value=0.0,
+                key="{}_om_escalation".format(key)
+            )/100
+
+        inverter_replacement_year = st.number_input(
+                label=color_pre_str+"Tausch des Wechselrichters im Jahr"+color_post_str,
+                value=12,
+                key="{}_inverter_replacement_year".format(key)
+            )
+
+        inverter_replacement_cost = st.number_input(
+                label=color_pre_str+"Kosten des Wechselrichtertauschs in EUR"+color_post_str,
+                value=0,
+                key="{}_inverter_replacement_cost".format(key)
+            )
+
+        if inverter_replacement_cost and (depreciation_period is not None) and \
+                not 0 <= inverter_replacement_year <= depreciation_period:
+            st.warning("Der Tausch des Wechselrichters im Jahr {} liegt außerhalb der Abschreibedauer von {} Jahren "
+                       "und wird nicht berücksichtigt.".format(inverter_replacement_year, depreciation_period))
+
+    inputs = {
+        "degradation": degradation,
+        "electricity_escalation": electricity_escalation,
+        "feed_in_escalation": feed_in_escalation,
+        "om_cost": om_cost,
+        "om_escalation": om_escalation,
+        "inverter_replacement_year": inverter_replacement_year,
+        "inverter_replacement_cost": inverter_replacement_cost,
+    }
+
+    return inputs
+
+
 def calculate_solar_pv_economics(system_cost, subsidy, pv_power, annual_electricity_production, electricity_rate, feed_in_tarif,
                                 interest_rate, depreciation_period, self_consumption_rate,
-                                tax_power_threshold=25, tax_feedin_threshold=12500, tax_rate=0.42):
+                                tax_power_threshold=25, tax_feedin_threshold=12500, tax_rate=0.42, sensitivities=False,
+                                yearly_revenues=None, yearly_costs=None, resolution="1Y", start_year=None):
     """
     Calculate the economics of a solar PV system for a residential customer.
 
@@ -161,18 +326,112 @@ def calculate_solar_pv_economics(system_cost, subsidy, pv_power, annual_electric
         payback_period (int): payback period in years (e.g. 20 years)
         tax_power_threshold:
         tax_feedin_threshold:
+        sensitivities (bool): additionally calculate the sensitivities of NPV and IRR (see src.sensitivities), only
+            with constant inputs
+        yearly_revenues (pd.DataFrame): yearly savings and feed-in revenues in EUR replacing the constant values of
+            electricity_rate and feed_in_tarif, e.g. from hourly prices (see src.tariffs.yearly_revenues). The column
+            "Produktion in kWh" is used for the LCOE if available.
+        yearly_costs (pd.DataFrame): additional yearly costs in EUR as positive numbers, one column per kind of cost
+            (e.g. operation and maintenance, see src.lifetime). They are added to the cash flows and the feed-in share
+            is deducted from the tax base.
+        resolution (str): period of the cash flows, "1Y" (years), "1Q" (quarters) or "1M" (months). The revenues
+            follow the seasonality of the production (PRODUCTION_SEASONALITY), the costs and the depreciation are
+            spread evenly over the periods of a year and the cash flows are discounted with the periodic rate.
+        start_year (int): calendar year of the first period in quarterly or monthly resolution (default the current
+            year). Pass it explicitly if the result is cached, so the dates do not depend on the day of the calculation.
 
     Returns:
-        dict: A dictionary containing the following results:
-            - 'net_cash_flows': pd Dataframe including all cash flows in EUR.
+        EconomicsResult: A compact result which can be accessed like a dictionary with the following keys:
+            - 'net_cash_flows': pd Dataframe including all cash flows in EUR (built on access).
             - 'annual_electricity_savings': Annual electricity savings in EUR.
             - 'annual_electricity_revenues': Annual electricity revenues by selling electricity into the grid in EUR.
-            - 'payback_period': Payback period in years.
+            - 'payback_period': Fractional payback period in years (NaN if the system never pays back).
+            - 'discounted_payback_period': Fractional payback period of the discounted cash flows in years.
+            - 'break_even_year': First year with a positive cumulative cash flow.
+            - 'profitability_index': Present value per EUR of net investment.
+            - 'lcoe': Levelized cost of electricity in EUR/kWh.
             - 'irr': Return on investment as a percentage.
             - 'npv': Net present value of the investment.
+            - 'tax_bases': pd Series of the tax bases in EUR (built on access).
+            - 'sensitivities': dict of the sensitivities of NPV and IRR (None if not calculated).
 
     """
 
+    yearly_production = None
+    if yearly_revenues is not None:
+        if "Produktion in kWh" in yearly_revenues.columns:
+            yearly_production = yearly_revenues["Produktion in kWh"].to_numpy()
+        yearly_revenues = yearly_revenues[[CASH_FLOW_COLUMNS[SAVINGS], CASH_FLOW_COLUMNS[FEEDIN]]].to_numpy()
+    columns = CASH_FLOW_COLUMNS
+    if yearly_costs is not None:
+        columns = columns + tuple(yearly_costs.columns)
+        yearly_costs = yearly_costs.to_numpy()
+
+    batch = calculate_solar_pv_economics_batch(
+        system_cost, subsidy, pv_power, annual_electricity_production, electricity_rate, feed_in_tarif,
+        interest_rate, depreciation_period, self_consumption_rate,
+        tax_power_threshold, tax_feedin_threshold, tax_rate, sensitivities,
+        yearly_revenues, yearly_production, yearly_costs, resolution
+    )
+
+    if resolution == "1Y":
+        periods, period_name = batch["years"], "Jahre"
+    else:
+        if start_year is None:
+            start_year = pd.Timestamp.today().year
+        periods = pd.date_range(start=pd.Timestamp(int(start_year), 1, 1), periods=len(batch["tax_bases"]),
+                                freq=PERIOD_FREQUENCIES[resolution])
+        period_name = "Datum"
+
+    return EconomicsResult(
+        batch["cash_flows"], batch["tax_bases"], periods, columns, period_name, resolution=resolution,
+        annual_electricity_savings=float(batch["annual_electricity_savings"]),
+        annual_electricity_revenues=float(batch["annual_electricity_revenues"]),
+        sensitivities=_to_float(batch["sensitivities"]) if sensitivities else None,
+        **{k: float(batch[k]) for k in KPIS}
+    )
+
+
+def _to_float(d):
+    """Convert the 0-d arrays of a (nested) dictionary into floats."""
+    return {k: _to_float(v) if isinstance(v, dict) else float(v) for k, v in d.items()}
+
+
+def calculate_solar_pv_economics_batch(system_cost, subsidy, pv_power, annual_electricity_production,
+                                       electricity_rate, feed_in_tarif, interest_rate, depreciation_period,
+                                       self_consumption_rate, tax_power_threshold=25, tax_feedin_threshold=12500,
+                                       tax_rate=0.42, sensitivities=False, yearly_revenues=None,
+                                       yearly_production=None, yearly_costs=None, resolution="1Y"):
+    """
+    Calculate the economics of many solar PV systems at once.
+
+    Takes the same arguments as calculate_solar_pv_economics, but all arguments except depreciation_period can be
+    arrays which are broadcast against each other (e.g. a grid of inputs). yearly_revenues is an array of the shape
+    (..., years, 2) with the savings and the feed-in revenues per year, yearly_production an array of the shape
+    (..., years) with the production per year in kWh and yearly_costs an array of the shape (..., years, costs) with
+    additional positive costs in EUR, which are appended to the cash flow components. The sensitivities refer to the
+    constant inputs and are only available in yearly resolution without yearly_revenues and yearly_costs.
+
+    In quarterly or monthly resolution ("1Q", "1M") every year is split into periods with the seasonality factors of
+    the production (revenues, tax bases) or evenly (costs, depreciation). The periodic rate (1+interest_rate)^(1/n)-1
+    is used for discounting, the IRR is annualized and the payback periods are given in years.
+
+    Returns:
+        dict: A dictionary of arrays with the shape of the broadcast inputs:
+            - 'years': range of the years.
+            - 'cash_flows': cash flows in EUR with the shape (..., periods, components) (see CASH_FLOW_COLUMNS).
+            - 'tax_bases': tax bases in EUR with the shape (..., periods).
+            - 'annual_electricity_savings', 'annual_electricity_revenues', 'annual_electricity_feedin'
+            - 'taxed': whether the feed-in is taxed.
+            - all KPIs of calculate_kpis ('npv', 'irr', 'payback_period', ...).
+            - 'sensitivities': sensitivities of NPV and IRR (only if sensitivities is True, see src.sensitivities).
+    """
+    (system_cost, subsidy, pv_power, annual_electricity_production, electricity_rate, feed_in_tarif, interest_rate,
+     self_consumption_rate, tax_power_threshold, tax_feedin_threshold, tax_rate) = np.broadcast_arrays(
+        *[np.asarray(x, dtype=np.float64) for x in (
+            system_cost, subsidy, pv_power, annual_electricity_production, electricity_rate, feed_in_tarif,
+            interest_rate, self_consumption_rate, tax_power_threshold, tax_feedin_threshold, tax_rate)])
+
     # Calculate annual electricity savings
     annual_electricity_savings = annual_electricity_production * electricity_rate * self_consumption_rate
 
@@ -185,50 +444,105 @@ def calculate_solar_pv_economics(system_cost, subsidy, pv_power, annual_electric
     depreciation_expense = system_cost * depreciation_rate
     depreciation_expense_for_feedin = depreciation_expense * (1-self_consumption_rate)
 
-    # Calculate net cash flow for each year
+    if resolution not in PERIODS_PER_YEAR:
+        raise ValueError("Resolution {} not supported (choose one of {})".format(
+            resolution, ", ".join(PERIODS_PER_YEAR)))
+    if sensitivities and (resolution != "1Y"):
+        raise ValueError("Sensitivities are only available in yearly resolution")
+    if sensitivities and ((yearly_revenues is not None) or (yearly_costs is not None)):
+        raise ValueError("Sensitivities are only available for constant inputs (without yearly revenues or costs)")
+    periods_per_year = PERIODS_PER_YEAR[resolution]
+    # share of the yearly production per period, repeated for every year
+    season = seasonality(resolution)
+
+    # Calculate net cash flow for each year (period)
     years = range(0, depreciation_period+1)
-    years_idx = pd.Index(years, name="Jahre")
-    net_cash_flows = pd.DataFrame(index=years_idx, columns=["Investition in EUR", "Steuer in EUR", "Eigenverbrauch in EUR", "Einspeisung in EUR"])
-    tax_bases = pd.Series(index=years_idx)
-
-    net_cash_flows.loc[years[0], "Investition in EUR"] = -system_cost
-    net_cash_flows.loc[years[0], "Förderung in EUR"] = subsidy
-    net_cash_flows.loc[:, "Eigenverbrauch in EUR"] = annual_electricity_savings
-    net_cash_flows.loc[:, "Einspeisung in EUR"] = annual_electricity_revenues
-
-    if (pv_power > tax_power_threshold) or (annual_electricity_feedin > tax_feedin_threshold):
-        tax_base = annual_electricity_revenues - depreciation_expense_for_feedin
-        tax = tax_base * tax_rate
-        net_cash_flows.loc[:, "Steuer in EUR"] = -tax
-        tax_bases.loc[:] = tax_base
+    n_periods = len(years) * periods_per_year
+    shape = system_cost.shape
+    n_costs = 0 if yearly_costs is None else np.shape(yearly_costs)[-1]
+    cash_flows = np.zeros(shape + (n_periods, len(CASH_FLOW_COLUMNS) + n_costs))
+
+    cash_flows[..., 0, INVESTMENT] = -system_cost
+    cash_flows[..., 0, SUBSIDY] = subsidy
+    if yearly_revenues is None:
+        cash_flows[..., SAVINGS] = annual_electricity_savings[..., np.newaxis] * np.tile(season, len(years))
+        cash_flows[..., FEEDIN] = annual_electricity_revenues[..., np.newaxis] * np.tile(season, len(years))
+    else:
+        yearly_revenues = np.asarray(yearly_revenues, dtype=np.float64)
+        if yearly_revenues.shape[-2] != len(years):
+            raise ValueError("Yearly revenues for {} years given, but {} years needed".format(
+                yearly_revenues.shape[-2], len(years)))
+        revenues = _split_years(yearly_revenues, season)
+        cash_flows[..., SAVINGS] = revenues[..., 0]
+        cash_flows[..., FEEDIN] = revenues[..., 1]
+
+    deductions = depreciation_expense_for_feedin[..., np.newaxis] / periods_per_year
+    if yearly_costs is not None:
+        even = np.full(periods_per_year, 1 / periods_per_year)
+        costs = _split_years(np.asarray(yearly_costs, dtype=np.float64), even)
+        cash_flows[..., len(CASH_FLOW_COLUMNS):] = 0. - costs
+        deductions = deductions + np.sum(costs, axis=-1) * (1-self_consumption_rate[..., np.newaxis])
+
+    taxed = (pv_power > tax_power_threshold) | (annual_electricity_feedin > tax_feedin_threshold)
+    tax_bases = np.where(taxed[..., np.newaxis], cash_flows[..., FEEDIN] - deductions, 0.)
+    cash_flows[..., TAX] = np.where(taxed[..., np.newaxis], -tax_bases * tax_rate[..., np.newaxis], 0.)
+
+    sum_of_cash_flows = cash_flows.sum(axis=-1)
+
+    # Calculate NPV, IRR, payback periods, profitability index and LCOE
+    cost_components = [INVESTMENT, TAX, SUBSIDY] + list(range(len(CASH_FLOW_COLUMNS), cash_flows.shape[-1]))
+    costs = -cash_flows[..., cost_components].sum(axis=-1)
+    if yearly_production is None:
+        energy = annual_electricity_production[..., np.newaxis] * np.tile(season, len(years))
+    else:
+        energy = _split_years(np.asarray(yearly_production, dtype=np.float64)[..., np.newaxis], season)[..., 0]
+    if periods_per_year == 1:
+        kpis = calculate_kpis(sum_of_cash_flows, interest_rate, system_cost - subsidy, costs, energy)
     else:
-        net_cash_flows.loc[:, "Steuer in EUR"] = 0
-        tax_bases.loc[:] = 0
+        periodic_rate = (1 + interest_rate) ** (1 / periods_per_year) - 1
+        # the search interval of the IRR is converted as well, (1-0.9)^-t overflows for hundreds of periods
+        kpis = calculate_kpis(sum_of_cash_flows, periodic_rate, system_cost - subsidy, costs, energy,
+                              irr_bracket=periodic_bracket(periods_per_year))
+        # annualized IRR and periods in years
+        kpis["irr"] = (1 + kpis["irr"]) ** periods_per_year - 1
+        kpis["payback_period"] = kpis["payback_period"] / periods_per_year
+        kpis["discounted_payback_period"] = kpis["discounted_payback_period"] / periods_per_year
+        kpis["break_even_year"] = np.floor(kpis["break_even_year"] / periods_per_year)
 
-    sum_of_cash_flows = net_cash_flows.sum(axis="columns")
-    cumsum_of_cash_flows = sum_of_cash_flows.cumsum()
+    results = {
+        "years": years,
+        "cash_flows": cash_flows,
+        "tax_bases": tax_bases,
+        "annual_electricity_savings": annual_electricity_savings,
+        "annual_electricity_revenues": annual_electricity_revenues,
+        "annual_electricity_feedin": annual_electricity_feedin,
+        "taxed": taxed,
+        **kpis
+    }
 
-    # Calculate payback period
-    payback_period = cumsum_of_cash_flows[cumsum_of_cash_flows > 0].idxmin()
+    if sensitivities:
+        inputs = dict(
+            system_cost=system_cost, subsidy=subsidy, pv_power=pv_power,
+            annual_electricity_production=annual_electricity_production, electricity_rate=electricity_rate,
+            feed_in_tarif=feed_in_tarif, interest_rate=interest_rate, depreciation_period=depreciation_period,
+            self_consumption_rate=self_consumption_rate, tax_power_threshold=tax_power_threshold,
+            tax_feedin_threshold=tax_feedin_threshold, tax_rate=tax_rate
+        )
+        results["sensitivities"] = calculate_sensitivities(inputs, taxed, kpis["npv"], kpis["irr"])
 
-    # Calculate net present value (NPV) of the investment
-    npv = npf.npv(interest_rate, sum_of_cash_flows.tolist())
+    return results
 
-    # Calculate return on investment (ROI)
-    irr = npf.irr(sum_of_cash_flows.tolist())
 
-    # Create results dictionary
-    results = {
-        'net_cash_flows': net_cash_flows,
-        'annual_electricity_savings': annual_electricity_savings,
-        'annual_electricity_revenues': annual_electricity_revenues,
-        'payback_period': payback_period,
-        'irr': irr,
-        'npv': npv,
-        'tax_bases': tax_bases
-    }
+def seasonality(resolution="1Y"):
+    """Share of the yearly production in each period of a year ("1Y", "1Q" or "1M")."""
+    periods_per_year = PERIODS_PER_YEAR[resolution]
+    return PRODUCTION_SEASONALITY.reshape(periods_per_year, -1).sum(axis=1)
 
-    return results
+
+def _split_years(values, shares):
+    """Split yearly values (..., years, columns) into periods (..., years * periods, columns) with the shares."""
+    split = values[..., :, np.newaxis, :] * shares[:, np.newaxis]
+    return split.reshape(values.shape[:-2] + (-1, values.shape[-1]))
 
 
 def format_german_nb(number, decimal=0, unit="EUR"):
@@ -242,6 +556,63 @@ def format_german_nb(number, decimal=0, unit="EUR"):
     return mystr
 
 
+def format_german_array(numbers, decimal=0, unit="EUR"):
+    """
+    Vectorized version of format_german_nb for whole arrays or columns.
+
+    Args:
+        numbers: array-like of numbers
+        decimal: number of decimals (0, 1 or 2 as in format_german_nb)
+        unit: unit appended to every number
+
+    Returns:
+        np.ndarray of strings identical to format_german_nb(number, decimal, unit) for each number
+    """
+    if decimal == 0:
+        str_format = "%.0f"
+    elif decimal == 1:
+        str_format = "%.1f"
+    else:
+        str_format = "%.2f"
+    strings = pd.Series(np.char.mod(str_format, np.asarray(numbers, dtype=np.float64).ravel()), dtype=object)
+    # thousands separator ' ' for the integer part and decimal separator ','
+    strings = strings.str.replace(r"(\d)(?=(\d{3})+(?!\d))", r"\1 ", regex=True).str.replace(".", ",", regex=False)
+    return (strings + " " + unit).to_numpy().reshape(np.shape(numbers))
+
+
+def format_german_frame(df, decimal=2, unit=""):
+    """Format all columns of df with format_german_array and return a DataFrame of strings."""
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+    formatted = format_german_array(df.to_numpy(dtype=np.float64), decimal, unit)
+    if not unit:
+        formatted = np.char.rstrip(formatted.astype(str))
+    return pd.DataFrame(formatted, index=df.index, columns=df.columns)
+
+
+def show_table(df, key, decimal=2, unit="", page_size=120):
+    """
+    Show df in German number format as a virtualized grid (st.dataframe). Tables with more than page_size rows are
+    split into pages.
+    """
+    formatted = format_german_frame(df.fillna(0), decimal, unit)
+
+    n_pages = int(np.ceil(len(formatted) / page_size))
+    if n_pages > 1:
+        page = st.number_input(label="Seite (von {})".format(n_pages), min_value=1, max_value=n_pages, value=1,
+                               key="{}_page".format(key))
+        formatted = formatted.iloc[(page - 1) * page_size:page * page_size]
+
+    st.dataframe(formatted, use_container_width=True)
+
+
+def format_german_kpi(number, decimal=0, unit="EUR", not_available="–"):
+    """Format a KPI like format_german_nb but show not_available for KPIs which can not be reached (NaN)."""
+    if np.isnan(number):
+        return not_available
+    return format_german_nb(number, decimal, unit).strip()
+
+
 def rename_columns(dataframe, old_part, new_part):
     df = dataframe.copy()
     new_columns = [col.replace(old_part, new_part) for col in df.columns]
@@ -249,41 +620,168 @@ def rename_columns(dataframe, old_part, new_part):
     return df
 
 
-def show_one_scenario(e, key):
+def show_approximate_kpis(kpis, error_bounds, name):
+    """Show the approximated KPIs of a response surface (see src.surface) until the exact result is available."""
+    st.caption("{} (Schnellschätzung): Nettobarwert {} ± {}, Amortisierungszeit {} ± {}, IRR {} ± {}".format(
+        name,
+        format_german_kpi(kpis["npv"], 0, "EUR"), format_german_kpi(error_bounds["npv"], 0, "EUR"),
+        format_german_kpi(kpis["payback_period"], 1, "Jahre"),
+        format_german_kpi(error_bounds["payback_period"], 1, "Jahre"),
+        format_german_kpi(kpis["irr"] * 100, 2, "%"), format_german_kpi(error_bounds["irr"] * 100, 2, "%"),
+    ))
+
+
+# labels of the maximum and the minimum, factor, decimals and unit of the break-even values (see src.breakeven)
+BREAK_EVEN_LABELS = {
+    "system_cost": (("Maximale Kosten der Anlage", "Minimale Kosten der Anlage"), 1, 0, "EUR"),
+    "feed_in_tarif": (("Maximaler Einspeisetarif", "Minimaler Einspeisetarif"), 100, 2, "ct/kWh"),
+    "self_consumption_rate": (("Maximaler Eigenverbrauchsgrad", "Minimaler Eigenverbrauchsgrad"), 100, 1, "%"),
+}
+
+SENSITIVITIES_NOT_AVAILABLE = "Die Sensitivitäten werden nur bei jährlicher Auflösung und ohne Annahmen über die " \
+                              "Lebensdauer (Degradation, Preissteigerungen, Betriebskosten, Ersatzinvestitionen) " \
+                              "berechnet."
+
+SENSITIVITY_LABELS = {
+    "system_cost": "Kosten der Anlage",
+    "subsidy": "Förderung der Anlage",
+    "annual_electricity_production": "Jährliche Produktionsmenge",
+    "electricity_rate": "Kosten des Netzbezugs",
+    "feed_in_tarif": "Einspeisetarif",
+    "interest_rate": "Zinssatz",
+    "depreciation_period": "Abschreibedauer",
+    "self_consumption_rate": "Eigenverbrauchsgrad",
+    "tax_rate": "Grenzsteuersatz",
+}
+
+
+def show_sensitivities(sensitivities, key):
+    """Show the elasticities of NPV and IRR and the jump at the switch of the taxation."""
+    inputs = list(SENSITIVITY_LABELS)
+    df = pd.DataFrame({
+        "Elastizität Nettobarwert": [sensitivities["npv_elasticity"][k] for k in inputs],
+        "Elastizität IRR": [sensitivities["irr_elasticity"][k] for k in inputs],
+    }, index=pd.Index([SENSITIVITY_LABELS[k] for k in inputs], name="Annahme"))
+
+    st.markdown("Relative Änderung des Nettobarwerts bzw. des IRR in % bei einer Erhöhung der Annahme um 1 %.")
+    show_table(df, key)
+
+    tax_switch = sensitivities["tax_switch"]
+    st.markdown("Sprung des Nettobarwerts bei Wechsel der Steuerpflicht: {}".format(
+        format_german_kpi(tax_switch["npv_jump"], 0, "EUR")))
+
+
+def scenario_figures_data(e):
+    """Data, add ons and plot settings of the figures of one scenario."""
+    return {
+        "net_cash_flows": (
+            rename_columns(e.net_cash_flows, "EUR", "Tausend EUR") / 1e3,
+            {
+                "line": {"data": e.cumsum_of_cash_flows / 1e3,
+                         "name": "Kummulierter Netto-Cash-Flow", "color": "darkred", "width": 2},
+            },
+            dict(title="Entwicklung des Netto-Cash-Flows", unit="Tausend EUR", kind="bar-stacked",
+                 resampling=e.resolution)
+        ),
+        "tax_bases": (
+            e.tax_bases.cumsum() / 1e3,
+            None,
+            dict(title="Entwicklung der kummulativen Steuerlichen Bemessungsgrundlage", unit="Tausend EUR",
+                 kind="bar", resampling=e.resolution)
+        ),
+    }
+
+
+def build_scenario_figures(e):
+    """Build the figures of one scenario with make_fig (no streamlit calls, can run in a worker thread)."""
+    figures = {}
+    for name, (df, add_on, kwargs) in scenario_figures_data(e).items():
+        figures[name] = make_fig(df, add_on, **kwargs) + (kwargs,)
+    return figures
+
+
+@lru_cache(maxsize=256)
+@disk_cache.memoize("scenario")
+def _evaluate_scenario(items):
+    from .breakeven import break_even_limits
+    from .lifetime import split_lifetime_inputs, simulate_lifetime
+
+    inputs, lifetime = split_lifetime_inputs(dict(items))
+    if lifetime:
+        e = simulate_lifetime(inputs, **lifetime)
+    else:
+        # the closed-form sensitivities are only available in yearly resolution
+        e = calculate_solar_pv_economics(**inputs, sensitivities=inputs.get("resolution", "1Y") == "1Y")
+    e.break_even = {k: (float(value), bool(maximum))
+                    for k, (value, maximum) in break_even_limits(inputs, lifetime=lifetime).items()}
+    return e, build_scenario_figures(e)
+
+
+def evaluate_scenario(inputs):
+    """
+    Calculate the economics and build the figures of one scenario. The results are cached process-wide and on disk
+    (see src.cache) by the inputs, so unchanged scenarios are not recalculated. Thread-safe, so it can be submitted to
+    the shared executor.
+
+    Returns:
+        tuple: EconomicsResult and the figures (see build_scenario_figures)
+    """
+    return _evaluate_scenario(tuple(sorted(with_start_year(inputs).items())))
+
+
+def with_start_year(inputs):
+    """
+    Inputs with the start year of quarterly and monthly periods (default the current year), so the dates of cached
+    results do not depend on the day of the calculation.
+    """
+    if inputs.get("resolution", "1Y") == "1Y" or "start_year" in inputs:
+        return inputs
+    return {**inputs, "start_year": pd.Timestamp.today().year}
+
+
+def show_one_scenario(e, key, figures=None):
+
+    if figures is None:
+        figures = build_scenario_figures(e)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Nettobarwert", format_german_nb(e.npv, 0, "EUR"), )
+    col2.metric("Amortisierungszeit", format_german_kpi(e.payback_period, 1, "Jahre"), )
+    col3.metric("IRR", format_german_kpi(e.irr * 100, 2, "%"), )
 
     col1, col2, col3 = st.columns(3)
-    col1.metric("Nettobarwert", format_german_nb(format(e["npv"]), 0, "EUR"), )
-    col2.metric("Amortisierungszeit", format_german_nb(format(e["payback_period"]), 0, "Jahre"), )
-    col3.metric("IRR", format_german_nb(format(e["irr"] * 100), 2, "%"), )
+    col1.metric("Stromgestehungskosten", format_german_kpi(e.lcoe * 100, 2, "ct/kWh"), )
+    col2.metric("Dynamische Amortisierungszeit", format_german_kpi(e.discounted_payback_period, 1, "Jahre"), )
+    col3.metric("Rentabilitätsindex", format_german_kpi(e.profitability_index, 2, ""), )
+
+    if e.break_even is not None:
+        help_text = "Grenzwert, bis zu dem der Nettobarwert nicht negativ ist (alle anderen Annahmen unverändert). " \
+                    "Ist der Nettobarwert im ganzen Wertebereich nicht negativ, wird dessen Grenze angezeigt, ist er " \
+                    "überall negativ, wird – angezeigt."
+        for col, (name, (value, maximum)) in zip(st.columns(len(e.break_even)), e.break_even.items()):
+            labels, factor, decimal, unit = BREAK_EVEN_LABELS[name]
+            col.metric(labels[0] if maximum else labels[1], format_german_kpi(value * factor, decimal, unit),
+                       help=help_text)
+
+    with st.expander("Sensitivitäten"):
+        if e.sensitivities is not None:
+            show_sensitivities(e.sensitivities, "{}_sensitivities".format(key))
+        else:
+            st.info(SENSITIVITIES_NOT_AVAILABLE)
 
     # Print the results
     st.markdown("### Gesamtergebnis")
-    ncf = e["net_cash_flows"]
-
-    fig_and_link(
-        rename_columns(ncf, "EUR", "Tausend EUR") / 1e3,
-        add_on={
-            "line": {"data": ncf.sum(axis="columns").cumsum() / 1e3,
-                     "name": "Kummulierter Netto-Cash-Flow", "color": "darkred", "width": 2},
-        },
-        title="Entwicklung des Netto-Cash-Flows", unit="Tausend EUR", kind="bar-stacked",
-        download_link=False
-    )
+    fig, df, kwargs = figures["net_cash_flows"]
+    fig_and_link(df, fig=fig, download_link=False, key="{}_ncf_chart".format(key), **kwargs)
 
-    if st.checkbox("Tabelle der Investitionsrechnung anzeigen", False, key=key):
-        st.markdown("Ergebnis der Investitionsrechnung im internationalen Zahlenformat (Tausender Trennzeichen ',' und Komma '.'")
-        st.table(ncf.fillna(0).style.format("{:,.2f}"))
+    if st.checkbox("Tabelle der Investitionsrechnung anzeigen", False, key="{}_ncf_checkbox".format(key)):
+        st.markdown("Ergebnis der Investitionsrechnung in EUR")
+        show_table(e.net_cash_flows, "{}_ncf".format(key))
 
     st.markdown("### Steuerlich")
-    tax_bases = e["tax_bases"]
-
-    fig_and_link(
-        tax_bases.cumsum() / 1e3,
-        title="Entwicklung der kummulativen Steuerlichen Bemessungsgrundlage", unit="Tausend EUR", kind="bar",
-        download_link=False
-    )
-
-    if st.checkbox("Tabelle der Steuerlichen Bemessungsgrundlage anzeigen", False, key=key):
-        st.markdown("Ergebnis der Investitionsrechnung im internationalen Zahlenformat (Tausender Trennzeichen ',' und Komma '.'")
-        st.table(tax_bases.fillna(0).cumsum().to_frame("Steuerliche Bemessungsgrundlage").style.format("{:,.2f}"))
+    fig, df, kwargs = figures["tax_bases"]
+    fig_and_link(df, fig=fig, download_link=False, key="{}_tax_chart".format(key), **kwargs)
 
+    if st.checkbox("Tabelle der Steuerlichen Bemessungsgrundlage anzeigen", False, key="{}_tax_checkbox".format(key)):
+        st.markdown("Kummulierte steuerliche Bemessungsgrundlage in EUR")
+        show_table(e.tax_bases.fillna(0).cumsum().to_frame("Steuerliche Bemessungsgrundlage"), "{}_tax".format(key))
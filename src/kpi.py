@@ -0,0 +1,200 @@
+"""
+Vectorized KPI kernel.
+
+All functions work on cash flow matrices with the periods along the last axis, e.g. an array of shape
+(scenarios, periods) or a single 1-D cash flow series. Rates are broadcast against the leading axes, so a single
+rate or one rate per scenario can be used. Scenarios which never pay back return NaN instead of raising an error.
+"""
+import numpy as np
+
+
+KPIS = ("npv", "irr", "payback_period", "discounted_payback_period", "break_even_year", "profitability_index", "lcoe")
+
+# search interval of the IRR per year
+IRR_BRACKET = (-0.9, 10.)
+
+
+def discount_factors(rate, n_periods):
+    """
+    Discount factors 1/(1+rate)^t for t = 0, ..., n_periods-1.
+
+    Args:
+        rate: discount rate per period as a decimal (scalar or array of shape (scenarios,))
+        n_periods: number of periods
+
+    Returns:
+        array of shape (..., n_periods)
+    """
+    rate = np.asarray(rate, dtype=np.float64)[..., np.newaxis]
+    return (1 + rate) ** -np.arange(n_periods, dtype=np.float64)
+
+
+def net_present_value(cash_flows, rate):
+    """Net present value of the cash flows (same convention as numpy_financial.npv, i.e. first period undiscounted)."""
+    cash_flows = np.asarray(cash_flows, dtype=np.float64)
+    return (cash_flows * discount_factors(rate, cash_flows.shape[-1])).sum(axis=-1)
+
+
+def break_even_period(cash_flows):
+    """
+    First period in which the cumulative cash flow is positive.
+
+    Returns:
+        float array with the period index or NaN if the investment never pays back
+    """
+    cumsum = np.cumsum(cash_flows, axis=-1)
+    paid_back = cumsum > 0
+    first = np.argmax(paid_back, axis=-1).astype(np.float64)
+    return np.where(paid_back.any(axis=-1), first, np.nan)
+
+
+def payback_period(cash_flows):
+    """
+    Fractional payback period, linearly interpolated between the last period with a non-positive and the first period
+    with a positive cumulative cash flow.
+
+    Returns:
+        float array with the payback period in periods or NaN if the investment never pays back
+    """
+    cumsum = np.cumsum(cash_flows, axis=-1)
+    paid_back = cumsum > 0
+    first = np.argmax(paid_back, axis=-1)
+    previous = np.maximum(first - 1, 0)
+
+    after = np.take_along_axis(cumsum, first[..., np.newaxis], axis=-1)[..., 0]
+    before = np.take_along_axis(cumsum, previous[..., np.newaxis], axis=-1)[..., 0]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.where(first > 0, -before / (after - before), 0.)
+    period = np.where(first > 0, previous + fraction, 0.)
+    return np.where(paid_back.any(axis=-1), period, np.nan)
+
+
+def discounted_payback_period(cash_flows, rate):
+    """Fractional payback period of the discounted cash flows (NaN if never paid back)."""
+    cash_flows = np.asarray(cash_flows, dtype=np.float64)
+    return payback_period(cash_flows * discount_factors(rate, cash_flows.shape[-1]))
+
+
+def profitability_index(cash_flows, rate, investment):
+    """
+    Profitability index, i.e. the present value of all cash flows after the investment per EUR invested.
+
+    Args:
+        cash_flows: net cash flows including the investment
+        rate: discount rate per period as a decimal
+        investment: (net) investment in EUR as a positive number
+
+    Returns:
+        1 + NPV / investment or NaN if there is no investment
+    """
+    investment = np.asarray(investment, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(investment > 0, 1 + net_present_value(cash_flows, rate) / investment, np.nan)
+
+
+def levelized_cost(costs, energy, rate):
+    """
+    Levelized cost of electricity (LCOE), i.e. present value of the costs divided by the present value of the
+    produced energy.
+
+    Args:
+        costs: costs per period in EUR as positive numbers
+        energy: produced energy per period in kWh
+        rate: discount rate per period as a decimal
+
+    Returns:
+        LCOE in EUR/kWh or NaN if no energy is produced
+    """
+    pv_costs = net_present_value(costs, rate)
+    pv_energy = net_present_value(energy, rate)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(pv_energy > 0, pv_costs / pv_energy, np.nan)
+
+
+def _horner_npv(cash_flows_by_period, rate):
+    """NPV by Horner's scheme for cash flows with the periods along the first axis (no discount factor matrix)."""
+    v = 1 / (1 + rate)
+    npv = cash_flows_by_period[-1] * np.ones_like(v)
+    for cash_flow in cash_flows_by_period[-2::-1]:
+        npv *= v
+        npv += cash_flow
+    return npv
+
+
+def internal_rate_of_return(cash_flows, lower=-0.9, upper=10., iterations=60):
+    """
+    Internal rate of return of many cash flow series at once by vectorized bisection.
+
+    The bisection finds the rate between lower and upper where the NPV changes its sign. This is the IRR for
+    conventional cash flows (an investment followed by returns); series without a sign change return NaN.
+    Large batches of long series (e.g. monthly periods) are evaluated with Horner's scheme, which avoids the
+    memory traffic of a discount factor matrix of the size of the cash flows in every iteration.
+    """
+    cash_flows = np.asarray(cash_flows, dtype=np.float64)
+    shape = cash_flows.shape[:-1]
+    if (cash_flows.shape[-1] > 64) and (np.prod(shape) >= 256):
+        cash_flows_by_period = np.ascontiguousarray(np.moveaxis(cash_flows, -1, 0))
+
+        def npv(rate):
+            return _horner_npv(cash_flows_by_period, rate)
+    else:
+        def npv(rate):
+            return net_present_value(cash_flows, rate)
+
+    low = np.full(shape, lower)
+    high = np.full(shape, upper)
+    npv_low = npv(low)
+    npv_high = npv(high)
+    valid = np.sign(npv_low) != np.sign(npv_high)
+
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        npv_mid = npv(mid)
+        same_sign = np.sign(npv_mid) == np.sign(npv_low)
+        low = np.where(same_sign, mid, low)
+        npv_low = np.where(same_sign, npv_mid, npv_low)
+        high = np.where(same_sign, high, mid)
+
+    return np.where(valid, (low + high) / 2, np.nan)
+
+
+def periodic_bracket(periods_per_year, bracket=IRR_BRACKET):
+    """Search interval of the IRR per period for a yearly interval, e.g. (-0.175, 0.221) for months."""
+    return tuple((1 + r) ** (1 / periods_per_year) - 1 for r in bracket)
+
+
+def calculate_kpis(cash_flows, rate, investment, costs=None, energy=None, irr_bracket=IRR_BRACKET):
+    """
+    Calculate all KPIs for one or many cash flow series at once.
+
+    Args:
+        cash_flows: net cash flows with the periods along the last axis in EUR
+        rate: discount rate per period as a decimal
+        investment: net investment in EUR as a positive number
+        costs: costs per period in EUR (positive), required for the LCOE
+        energy: produced energy per period in kWh, required for the LCOE
+        irr_bracket: search interval of the IRR per period (lower, upper), convert IRR_BRACKET with periodic_bracket
+                     for periods shorter than a year
+
+    Returns:
+        dict: A dictionary of arrays with the following KPIs:
+            - 'npv': Net present value in EUR
+            - 'irr': Internal rate of return per period as a decimal
+            - 'payback_period': Fractional payback period in periods
+            - 'discounted_payback_period': Fractional payback period of the discounted cash flows in periods
+            - 'break_even_year': First period with a positive cumulative cash flow
+            - 'profitability_index': Present value per EUR invested
+            - 'lcoe': Levelized cost of electricity in EUR/kWh
+    """
+    kpis = {
+        "npv": net_present_value(cash_flows, rate),
+        "irr": internal_rate_of_return(cash_flows, *irr_bracket),
+        "payback_period": payback_period(cash_flows),
+        "discounted_payback_period": discounted_payback_period(cash_flows, rate),
+        "break_even_year": break_even_period(cash_flows),
+        "profitability_index": profitability_index(cash_flows, rate, investment),
+    }
+    if (costs is not None) and (energy is not None):
+        kpis["lcoe"] = levelized_cost(costs, energy, rate)
+    return kpis
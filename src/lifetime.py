@@ -0,0 +1,199 @@
+"""
+Lifetime simulation of a PV system with degradation, price escalation, operation and maintenance (O&M) costs and
+replacement events (e.g. the inverter).
+
+The simulation creates the yearly revenues and costs which are passed to calculate_solar_pv_economics
+(yearly_revenues and yearly_costs), so NPV, IRR and all other KPIs are calculated as before. For hourly scenarios the
+years are produced by generators one at a time (see src.tariffs), so a 30 year hourly run holds only one year of
+hourly data in memory.
+"""
+from warnings import warn
+
+import numpy as np
+import pandas as pd
+
+from .functions import calculate_solar_pv_economics, calculate_solar_pv_economics_batch
+from .results import CASH_FLOW_COLUMNS, SAVINGS, FEEDIN
+from .tariffs import iter_hourly_prices, iter_yearly_revenues, economics_inputs_from_revenues, price_kwargs, \
+    REVENUE_COLUMNS
+
+
+LIFETIME_INPUTS = ("degradation", "electricity_escalation", "feed_in_escalation", "om_cost", "om_escalation",
+                   "replacements")
+COST_COLUMNS = ("Betrieb in EUR", "Ersatzinvestition in EUR")
+
+
+def lifetime_factors(n_years, degradation=0., electricity_escalation=0., feed_in_escalation=0., om_cost=0.,
+                     om_escalation=0., replacements=None):
+    """
+    Yearly factors and costs over the lifetime.
+
+    Args:
+        n_years: number of years (depreciation_period + 1)
+        degradation: yearly loss of production as a decimal (e.g. 0.005 for 0.5 %/a)
+        electricity_escalation: yearly increase of the electricity rate as a decimal
+        feed_in_escalation: yearly increase of the feed-in tarif as a decimal
+        om_cost: operation and maintenance costs in EUR per year (in the first year)
+        om_escalation: yearly increase of the O&M costs as a decimal
+        replacements: dict with the year as key and the costs in EUR as value (e.g. {12: 1500} for the inverter),
+                      replacements outside of the years are ignored with a warning
+
+    Returns:
+        pd.DataFrame with the years as index and the columns "Produktion", "Strompreis", "Einspeisetarif" (factors
+        relative to the first year) and the costs COST_COLUMNS in EUR
+    """
+    t = np.arange(n_years, dtype=np.float64)
+    replacement_costs = np.zeros(n_years)
+    for year, cost in (replacements or {}).items():
+        if not 0 <= int(year) < n_years:
+            warn("Replacement in year {} outside of the {} years is ignored".format(year, n_years))
+            continue
+        replacement_costs[int(year)] += cost
+
+    return pd.DataFrame({
+        "Produktion": (1 - degradation) ** t,
+        "Strompreis": (1 + electricity_escalation) ** t,
+        "Einspeisetarif": (1 + feed_in_escalation) ** t,
+        COST_COLUMNS[0]: om_cost * (1 + om_escalation) ** t,
+        COST_COLUMNS[1]: replacement_costs,
+    }, index=pd.Index(range(n_years), name="Jahre"))
+
+
+def split_lifetime_inputs(inputs):
+    """
+    Split the inputs of the app into the inputs of calculate_solar_pv_economics and the lifetime inputs. Lifetime
+    inputs without effect (zero) are dropped, the inverter replacement is converted into replacements.
+
+    Returns:
+        tuple: dict with the economic inputs and dict with the lifetime inputs (see lifetime_factors)
+    """
+    inputs = dict(inputs)
+    replacement_year = inputs.pop("inverter_replacement_year", None)
+    replacement_cost = inputs.pop("inverter_replacement_cost", 0)
+    lifetime = {k: inputs.pop(k) for k in LIFETIME_INPUTS if k in inputs}
+    lifetime = {k: v for k, v in lifetime.items() if v}
+    if replacement_cost:
+        lifetime["replacements"] = {**lifetime.get("replacements", {}), int(replacement_year): replacement_cost}
+    return inputs, lifetime
+
+
+def simulate_lifetime(inputs, **kwargs):
+    """
+    Calculate the economics with degradation, escalation, O&M costs and replacements in yearly resolution.
+
+    Args:
+        inputs: dict with the inputs of calculate_solar_pv_economics
+        **kwargs: lifetime inputs (see lifetime_factors)
+
+    Returns:
+        EconomicsResult
+    """
+    factors = lifetime_factors(inputs["depreciation_period"] + 1, **kwargs)
+    production = inputs["annual_electricity_production"] * factors["Produktion"]
+    self_consumption_rate = inputs["self_consumption_rate"]
+
+    revenues = pd.DataFrame({
+        CASH_FLOW_COLUMNS[SAVINGS]: production * self_consumption_rate * inputs["electricity_rate"] *
+        factors["Strompreis"],
+        CASH_FLOW_COLUMNS[FEEDIN]: production * (1 - self_consumption_rate) * inputs["feed_in_tarif"] *
+        factors["Einspeisetarif"],
+        "Produktion in kWh": production,
+    })
+    return calculate_solar_pv_economics(**inputs, yearly_revenues=revenues,
+                                        yearly_costs=factors.loc[:, list(COST_COLUMNS)])
+
+
+def simulate_lifetime_batch(inputs, **kwargs):
+    """
+    Calculate the economics of many scenarios with the same lifetime inputs at once (e.g. for the break-even values).
+
+    Args:
+        inputs: dict with the inputs of calculate_solar_pv_economics_batch (scalars or arrays)
+        **kwargs: lifetime inputs (see lifetime_factors)
+
+    Returns:
+        dict: see calculate_solar_pv_economics_batch
+    """
+    factors = lifetime_factors(inputs["depreciation_period"] + 1, **kwargs)
+    annual_electricity_production, self_consumption_rate, electricity_rate, feed_in_tarif = (
+        np.asarray(inputs[k], dtype=np.float64)[..., np.newaxis]
+        for k in ("annual_electricity_production", "self_consumption_rate", "electricity_rate", "feed_in_tarif"))
+    production = annual_electricity_production * factors["Produktion"].to_numpy()
+
+    revenues = np.stack(np.broadcast_arrays(
+        production * self_consumption_rate * electricity_rate * factors["Strompreis"].to_numpy(),
+        production * (1 - self_consumption_rate) * feed_in_tarif * factors["Einspeisetarif"].to_numpy(),
+    ), axis=-1)
+    return calculate_solar_pv_economics_batch(**inputs, yearly_revenues=revenues, yearly_production=production,
+                                              yearly_costs=factors.loc[:, list(COST_COLUMNS)].to_numpy())
+
+
+def _escalate(prices, escalation):
+    """Multiply the yearly price arrays with (1 + escalation)^year."""
+    for year, p in enumerate(prices):
+        yield p * np.float32((1 + escalation) ** year)
+
+
+def iter_hourly_lifetime(production, consumption, feed_in_prices, import_prices, n_years, degradation=0.,
+                         electricity_escalation=0., feed_in_escalation=0., feed_in_markup=0., import_markup=0.,
+                         feed_in_kwargs=None, import_kwargs=None, **kwargs):
+    """
+    Yield the yearly revenues of an hourly scenario one year at a time.
+
+    Args:
+        production: hourly production profile of the first year in kWh (float32 array)
+        consumption: hourly consumption in kWh (one array for all years or an iterable of yearly arrays)
+        feed_in_prices: source of the hourly feed-in prices (see src.tariffs.iter_hourly_prices)
+        import_prices: source of the hourly import prices (see src.tariffs.iter_hourly_prices)
+        n_years: number of years
+        degradation: yearly loss of production as a decimal
+        electricity_escalation: yearly increase of the import prices (including the markup) as a decimal
+        feed_in_escalation: yearly increase of the feed-in prices (including the markup) as a decimal
+        feed_in_markup: added to the feed-in prices in EUR/kWh
+        import_markup: added to the import prices in EUR/kWh
+        feed_in_kwargs: dict passed to src.tariffs.load_hourly_prices for the feed-in prices
+        import_kwargs: dict passed to src.tariffs.load_hourly_prices for the import prices
+        **kwargs: passed to src.tariffs.load_hourly_prices for both sources (see src.tariffs.price_kwargs)
+
+    Yields:
+        tuple: savings and feed-in revenues in EUR, production, self-consumption and feed-in in kWh of one year
+    """
+    production = np.asarray(production, dtype=np.float32)
+    yearly_production = (production * np.float32((1 - degradation) ** year) for year in range(n_years))
+    feed_in_kwargs, import_kwargs = price_kwargs(False, feed_in_kwargs, import_kwargs, **kwargs)
+    feed_in = (p + np.float32(feed_in_markup) for p in iter_hourly_prices(feed_in_prices, n_years, **feed_in_kwargs))
+    imports = (p + np.float32(import_markup) for p in iter_hourly_prices(import_prices, n_years, **import_kwargs))
+    return iter_yearly_revenues(yearly_production, consumption, _escalate(feed_in, feed_in_escalation),
+                                _escalate(imports, electricity_escalation), n_years)
+
+
+def simulate_hourly_lifetime(inputs, production, consumption, feed_in_prices, import_prices=None, om_cost=0.,
+                             om_escalation=0., replacements=None, **kwargs):
+    """
+    Calculate the economics of an hourly scenario over the lifetime.
+
+    Args:
+        inputs: dict with the inputs of calculate_solar_pv_economics; the production, the self-consumption rate and
+                the prices are replaced by the hourly simulation
+        production: hourly production profile of the first year in kWh
+        consumption: hourly consumption in kWh
+        feed_in_prices: source of the hourly feed-in prices (see src.tariffs.iter_hourly_prices)
+        import_prices: source of the hourly import prices (default the feed-in prices with their feed_in_kwargs)
+        om_cost, om_escalation, replacements: see lifetime_factors
+        **kwargs: see iter_hourly_lifetime
+
+    Returns:
+        EconomicsResult
+    """
+    n_years = inputs["depreciation_period"] + 1
+    if import_prices is None:
+        import_prices = feed_in_prices
+        kwargs.setdefault("import_kwargs", kwargs.get("feed_in_kwargs"))
+
+    rows = list(iter_hourly_lifetime(production, consumption, feed_in_prices, import_prices, n_years, **kwargs))
+    revenues = pd.DataFrame(rows, index=pd.Index(range(n_years), name="Jahre"), columns=list(REVENUE_COLUMNS))
+    costs = lifetime_factors(n_years, om_cost=om_cost, om_escalation=om_escalation, replacements=replacements)
+
+    inputs = {**inputs, **economics_inputs_from_revenues(revenues)}
+    return calculate_solar_pv_economics(**inputs, yearly_revenues=revenues,
+                                        yearly_costs=costs.loc[:, list(COST_COLUMNS)])
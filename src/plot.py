@@ -4,12 +4,13 @@ import plotly.graph_objects as go
 import plotly.io as pio
 import plotly.express as px
 
-import yaml
 import pandas as pd
 from warnings import warn
 import datetime as dt
 import seaborn as sns
 
+from .cache import load_settings, resource
+
 
 def color_generator(name, items):
     colors = pd.Series(sns.color_palette(name, len(items)).as_hex())
@@ -35,15 +36,35 @@ def hover_datetime_format(resampling):
         raise UserWarning("Resampling factor " + resampling + " not supported!")
 
 
+@resource
+def ew_style_template():
+    """Plotly template of the app, built once per process."""
+    return go.layout.Template(
+        # layout=go.Layout(font=dict(family="IBM Plex Sans", size=12)),
+        # layout=go.Layout(font=dict(family="Roboto", size=12)),
+        layout=go.Layout(
+            font=dict(
+                family="Roboto",    # Arial, Helvetica, Roboto, IBM Plex Sans
+                size=12,
+            ),
+            paper_bgcolor='white',
+            plot_bgcolor='white',
+            yaxis={'side': 'right'},
+        ),
+
+        # layout_paper_bgcolor = 'rgba(0,0,0,1)',
+        # layout_plot_bgcolor = 'rgba(0,0,0,1)',
+    )
+
+
 class Plot(object):
     """
     Object enabling the plotting.
     """
 
     def __init__(self, style: str = "plotly", settings: str = "settings/plotting.yml", default_saving=False):
-        # Load yaml settings
-        with open(settings, mode="r", encoding='utf8') as file:
-            self.settings = yaml.load(file, Loader=yaml.FullLoader)
+        # Load yaml settings (parsed once per process and shared, see src.cache)
+        self.settings = load_settings(settings)
 
         # Plotting setting
         self.path = self.settings["path"]
@@ -62,22 +83,7 @@ class Plot(object):
 
         elif style == "plotly":
             # plotly settings
-            pio.templates["ew_style"] = go.layout.Template(
-                # layout=go.Layout(font=dict(family="IBM Plex Sans", size=12)),
-                # layout=go.Layout(font=dict(family="Roboto", size=12)),
-                layout=go.Layout(
-                    font=dict(
-                        family="Roboto",    # Arial, Helvetica, Roboto, IBM Plex Sans
-                        size=12,
-                    ),
-                    paper_bgcolor='white',
-                    plot_bgcolor='white',
-                    yaxis={'side': 'right'},
-                ),
-
-                # layout_paper_bgcolor = 'rgba(0,0,0,1)',
-                # layout_plot_bgcolor = 'rgba(0,0,0,1)',
-            )
+            pio.templates["ew_style"] = ew_style_template()
             # pio.templates.default = "seaborn+ew_style"
             pio.templates.default = "simple_white+ew_style"
             # pio.templates.default = "ew_style"
@@ -0,0 +1,75 @@
+"""
+Process pool of warm image renderers for the plotly figures.
+
+The static image export of plotly (kaleido) starts a browser process on the first export, which takes about a second.
+Every worker of the pool does this once when it is started (warm_up), so the exports themselves only take some
+milliseconds. The module only imports plotly, so the workers start quickly.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+
+# same size as the svg download of fig_and_link
+WIDTH = 600
+HEIGHT = 500
+
+_pool = None
+_lock = threading.Lock()
+
+
+def warm_up():
+    """Export an empty figure to start the renderer of this process."""
+    pio.to_image(go.Figure(), format="svg", width=10, height=10)
+
+
+def render_svg(figure, width=WIDTH, height=HEIGHT):
+    """
+    Export a figure as svg.
+
+    Args:
+        figure: plotly figure as dict (fig.to_dict(), cheaper to send to a worker than the figure)
+        width: width in px
+        height: height in px
+
+    Returns:
+        str with the svg
+    """
+    return pio.to_image(figure, format="svg", width=width, height=height, validate=False).decode("utf-8")
+
+
+def get_render_pool(max_workers=None):
+    """
+    Process pool of warm renderers shared by all sessions, started on the first call. The workers are spawned (not
+    forked), since the streamlit server runs threads.
+    """
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers or min(4, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_up,
+            )
+        return _pool
+
+
+def render_svgs(figures, width=WIDTH, height=HEIGHT):
+    """
+    Export many figures as svg in the process pool.
+
+    Args:
+        figures: list of plotly figures
+        width: width in px
+        height: height in px
+
+    Returns:
+        list of str with the svgs in the order of the figures
+    """
+    figures = [fig.to_dict() for fig in figures]
+    pool = get_render_pool()
+    return list(pool.map(render_svg, figures, [width] * len(figures), [height] * len(figures)))
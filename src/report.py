@@ -0,0 +1,178 @@
+"""
+Report with the assumptions, KPIs, charts and tables of all scenarios as a single self-contained HTML document.
+
+The scenarios are evaluated with evaluate_scenario (cached, in the shared thread pool), all figures of all scenarios
+are exported as svg at once in the process pool of warm renderers (see src.render) and embedded as base64 images, so
+the document needs no further files. Reports are cached in memory and on disk (see src.cache) by the scenarios.
+"""
+import base64
+import hashlib
+import html
+import json
+from functools import lru_cache
+
+import pandas as pd
+
+from .functions import evaluate_scenario, format_german_frame, format_german_kpi, format_german_nb, \
+    with_start_year, SENSITIVITIES_NOT_AVAILABLE, SENSITIVITY_LABELS
+from .cache import disk_cache
+from .render import render_svgs
+from .utils import executor, make_fig
+
+
+# label, factor and decimals of the inputs in the report
+REPORT_INPUTS = {
+    "pv_power": ("Größe der PV Anlage in kW", 1, 1),
+    "annual_electricity_production": ("Jährliche Produktionsmenge in kWh", 1, 0),
+    "self_consumption_rate": ("Eigenverbrauchsgrad in %", 100, 1),
+    "system_cost": ("Kosten der Anlage in EUR", 1, 0),
+    "subsidy": ("Förderung der Anlage in EUR", 1, 0),
+    "depreciation_period": ("Abschreibedauer der Anlage in Jahren", 1, 0),
+    "electricity_rate": ("Kosten des Netzbezugs in EUR/kWh", 1, 3),
+    "feed_in_tarif": ("Einspeisetarif in EUR/kWh", 1, 3),
+    "interest_rate": ("Zinssatz in %", 100, 2),
+    "tax_power_threshold": ("Schwellenwert Leistung in kWp", 1, 1),
+    "tax_feedin_threshold": ("Schwellenwert Einspeisemenge in kWh", 1, 0),
+    "tax_rate": ("Grenzsteuersatz in %", 100, 1),
+    "degradation": ("Jährliche Degradation der Module in %", 100, 2),
+    "electricity_escalation": ("Jährliche Steigerung der Kosten des Netzbezugs in %", 100, 2),
+    "feed_in_escalation": ("Jährliche Steigerung des Einspeisetarifs in %", 100, 2),
+    "om_cost": ("Betriebs- und Wartungskosten in EUR pro Jahr", 1, 0),
+    "om_escalation": ("Jährliche Steigerung der Betriebskosten in %", 100, 2),
+    "inverter_replacement_year": ("Tausch des Wechselrichters im Jahr", 1, 0),
+    "inverter_replacement_cost": ("Kosten des Wechselrichtertauschs in EUR", 1, 0),
+}
+
+STYLE = """
+body {font-family: sans-serif; max-width: 900px; margin: auto; color: #222;}
+table {border-collapse: collapse; margin-bottom: 1em;}
+th, td {border: 1px solid #ccc; padding: 2px 8px; text-align: right;}
+th:first-child, td:first-child {text-align: left;}
+img {max-width: 100%;}
+section {page-break-before: always;}
+"""
+
+
+def _canonical(scenarios):
+    """Hashable, ordered representation of the scenarios (dict name -> inputs)."""
+    return tuple((name, tuple(sorted(inputs.items()))) for name, inputs in scenarios.items())
+
+
+def report_fingerprint(scenarios):
+    """
+    Fingerprint of the report of the scenarios (dict name -> inputs), e.g. for the file name.
+
+    Returns:
+        str with the sha256 hex digest
+    """
+    return hashlib.sha256(json.dumps(_canonical(scenarios), default=str).encode("utf-8")).hexdigest()
+
+
+def _img(svg):
+    return '<img src="data:image/svg+xml;base64,{}"/>'.format(base64.b64encode(svg.encode("utf-8")).decode("utf-8"))
+
+
+def _table(df):
+    return df.to_html(border=0)
+
+
+def kpi_frame(economics):
+    """
+    KPIs of the scenarios (dict name -> EconomicsResult) as formatted table with one column per scenario.
+    """
+    rows = {
+        "Nettobarwert": lambda e: format_german_nb(e.npv, 0, "EUR").strip(),
+        "Amortisierungszeit": lambda e: format_german_kpi(e.payback_period, 1, "Jahre"),
+        "IRR": lambda e: format_german_kpi(e.irr * 100, 2, "%"),
+        "Stromgestehungskosten": lambda e: format_german_kpi(e.lcoe * 100, 2, "ct/kWh"),
+        "Dynamische Amortisierungszeit": lambda e: format_german_kpi(e.discounted_payback_period, 1, "Jahre"),
+        "Rentabilitätsindex": lambda e: format_german_kpi(e.profitability_index, 2, ""),
+    }
+    return pd.DataFrame({name: [f(e) for f in rows.values()] for name, e in economics.items()},
+                        index=pd.Index(list(rows), name="Kennzahl"))
+
+
+def inputs_frame(scenarios):
+    """Assumptions of the scenarios (dict name -> inputs) as formatted table with one column per scenario."""
+    keys = [k for k in REPORT_INPUTS if any(k in inputs for inputs in scenarios.values())]
+    data = {}
+    for name, inputs in scenarios.items():
+        data[name] = [
+            format_german_nb(inputs[k] * REPORT_INPUTS[k][1], REPORT_INPUTS[k][2], "").strip() if k in inputs else "–"
+            for k in keys
+        ]
+    return pd.DataFrame(data, index=pd.Index([REPORT_INPUTS[k][0] for k in keys], name="Annahme"))
+
+
+def _sensitivities_frame(sensitivities):
+    inputs = list(SENSITIVITY_LABELS)
+    df = pd.DataFrame({
+        "Elastizität Nettobarwert": [sensitivities["npv_elasticity"][k] for k in inputs],
+        "Elastizität IRR": [sensitivities["irr_elasticity"][k] for k in inputs],
+    }, index=pd.Index([SENSITIVITY_LABELS[k] for k in inputs], name="Annahme"))
+    return format_german_frame(df.fillna(0))
+
+
+@lru_cache(maxsize=32)
+@disk_cache.memoize("report")
+def _build_report(canonical):
+    scenarios = {name: dict(items) for name, items in canonical}
+    names = list(scenarios)
+
+    results = list(executor.map(evaluate_scenario, scenarios.values()))
+    economics = {name: e for name, (e, _) in zip(names, results)}
+
+    # all figures of all scenarios (and the comparison) are exported at once
+    figures = []
+    for _, scenario_figures in results:
+        figures.extend(fig for fig, _, _ in scenario_figures.values())
+    if len(names) > 1:
+        cumulative_ncf = pd.DataFrame({name: e.yearly_cumsum_of_cash_flows for name, e in economics.items()})
+        fig, _ = make_fig(cumulative_ncf / 1e3, title="Entwicklung des Netto-Cash-Flows aller Szenarien",
+                          unit="Tausend EUR", kind="line")
+        figures.append(fig)
+    svgs = iter(render_svgs(figures))
+
+    body = ["<h1>Photovoltaik Rechner | HOLZINGER.TAX</h1>",
+            "<h2>Übersicht</h2>", _table(kpi_frame(economics)),
+            "<h2>Annahmen</h2>", _table(inputs_frame(scenarios))]
+
+    for name, (e, scenario_figures) in zip(names, results):
+        body.append("<section><h2>{}</h2>".format(html.escape(name)))
+        body.append("<h3>Gesamtergebnis</h3>")
+        body.append(_img(next(svgs)))
+        body.append("<p>Ergebnis der Investitionsrechnung in EUR</p>")
+        body.append(_table(format_german_frame(e.net_cash_flows.fillna(0))))
+        body.append("<h3>Steuerlich</h3>")
+        body.append(_img(next(svgs)))
+        body.append("<p>Kummulierte steuerliche Bemessungsgrundlage in EUR</p>")
+        body.append(_table(format_german_frame(
+            e.tax_bases.fillna(0).cumsum().to_frame("Steuerliche Bemessungsgrundlage"))))
+        body.append("<h3>Sensitivitäten</h3>")
+        if e.sensitivities is not None:
+            body.append("<p>Relative Änderung des Nettobarwerts bzw. des IRR in % bei einer Erhöhung der Annahme um "
+                        "1 %.</p>")
+            body.append(_table(_sensitivities_frame(e.sensitivities)))
+        else:
+            body.append("<p>{}</p>".format(html.escape(SENSITIVITIES_NOT_AVAILABLE)))
+        body.append("</section>")
+
+    if len(names) > 1:
+        body.append("<section><h2>Vergleich</h2>{}</section>".format(_img(next(svgs))))
+
+    return ('<!DOCTYPE html>\n<html lang="de">\n<head>\n<meta charset="utf-8">\n'
+            '<title>Photovoltaik Rechner - Bericht</title>\n<style>{}</style>\n</head>\n<body>\n{}\n</body>\n</html>\n'
+            ).format(STYLE, "\n".join(body))
+
+
+def build_report(scenarios):
+    """
+    Build the HTML report of the scenarios. Reports of the same scenarios are cached process-wide and on disk.
+
+    Args:
+        scenarios: dict with the scenario name as key and the inputs of the scenario (see evaluate_scenario) as value
+
+    Returns:
+        str with the self-contained HTML document
+    """
+    return _build_report(_canonical({name: with_start_year(inputs) for name, inputs in scenarios.items()}))
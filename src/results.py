@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+
+CASH_FLOW_COLUMNS = ("Investition in EUR", "Steuer in EUR", "Eigenverbrauch in EUR", "Einspeisung in EUR",
+                     "Förderung in EUR")
+# positions of the components within the cash flow block
+INVESTMENT, TAX, SAVINGS, FEEDIN, SUBSIDY = range(len(CASH_FLOW_COLUMNS))
+# periods of the cash flows per year for the resolutions (resampling codes of src.plot)
+PERIODS_PER_YEAR = {"1Y": 1, "1Q": 4, "1M": 12}
+
+
+class EconomicsResult(object):
+    """
+    Compact result of an economic calculation.
+
+    The cash flows are stored as one contiguous float64 block (periods x components) together with the tax bases
+    and the scalar KPIs. DataFrame and Series views are only built when they are accessed, e.g. for plotting or
+    displaying tables. For compatibility the result can still be accessed like the former result dictionary,
+    e.g. result["npv"] or result["net_cash_flows"].
+    """
+
+    __slots__ = ("cash_flows", "tax_bases_array", "periods", "columns", "period_name",
+                 "annual_electricity_savings", "annual_electricity_revenues", "payback_period",
+                 "discounted_payback_period", "break_even_year", "profitability_index", "lcoe", "irr", "npv",
+                 "sensitivities", "break_even", "resolution")
+
+    def __init__(self, cash_flows, tax_bases, periods, columns=CASH_FLOW_COLUMNS, period_name="Jahre",
+                 annual_electricity_savings=np.nan, annual_electricity_revenues=np.nan,
+                 payback_period=np.nan, discounted_payback_period=np.nan, break_even_year=np.nan,
+                 profitability_index=np.nan, lcoe=np.nan, irr=np.nan, npv=np.nan, sensitivities=None,
+                 break_even=None, resolution="1Y"):
+        """
+        Args:
+            cash_flows: 2-D array of cash flows in EUR with one row per period and one column per component
+            tax_bases: 1-D array of the tax bases in EUR per period
+            periods: labels of the periods (e.g. the years)
+            columns: names of the cash flow components
+            period_name: name of the period index
+            annual_electricity_savings: Annual electricity savings in EUR
+            annual_electricity_revenues: Annual electricity revenues in EUR
+            payback_period: Fractional payback period in years (NaN if never paid back)
+            discounted_payback_period: Fractional payback period of the discounted cash flows in years
+            break_even_year: First year with a positive cumulative cash flow
+            profitability_index: Present value per EUR of net investment
+            lcoe: Levelized cost of electricity in EUR/kWh
+            irr: Internal rate of return as a decimal
+            npv: Net present value of the investment in EUR
+            sensitivities: dict of the sensitivities of NPV and IRR (see src.sensitivities) or None
+            break_even: dict with the break-even limit of the inputs and whether it is a maximum (see
+                src.breakeven.break_even_limits) or None
+            resolution: resampling code of the periods ("1Y", "1Q" or "1M"), used for plotting
+        """
+        self.cash_flows = np.ascontiguousarray(cash_flows, dtype=np.float64)
+        self.tax_bases_array = np.ascontiguousarray(tax_bases, dtype=np.float64)
+        self.periods = periods
+        self.columns = tuple(columns)
+        self.period_name = period_name
+        self.annual_electricity_savings = annual_electricity_savings
+        self.annual_electricity_revenues = annual_electricity_revenues
+        self.payback_period = payback_period
+        self.discounted_payback_period = discounted_payback_period
+        self.break_even_year = break_even_year
+        self.profitability_index = profitability_index
+        self.lcoe = lcoe
+        self.irr = irr
+        self.npv = npv
+        self.sensitivities = sensitivities
+        self.break_even = break_even
+        self.resolution = resolution
+
+        if self.cash_flows.shape != (len(self.periods), len(self.columns)):
+            raise ValueError("Shape of cash flows {} does not match {} periods and {} columns".format(
+                self.cash_flows.shape, len(self.periods), len(self.columns)))
+
+    def __getitem__(self, item):
+        if item not in self.keys():
+            raise KeyError(item)
+        return getattr(self, item)
+
+    def keys(self):
+        return ("net_cash_flows", "annual_electricity_savings", "annual_electricity_revenues", "payback_period",
+                "discounted_payback_period", "break_even_year", "profitability_index", "lcoe", "irr", "npv",
+                "tax_bases", "sensitivities", "break_even")
+
+    @property
+    def index(self):
+        return pd.Index(self.periods, name=self.period_name)
+
+    @property
+    def sum_of_cash_flows_array(self):
+        return self.cash_flows.sum(axis=1)
+
+    @property
+    def net_cash_flows(self):
+        """DataFrame view of the cash flows."""
+        return pd.DataFrame(self.cash_flows, index=self.index, columns=list(self.columns), copy=False)
+
+    @property
+    def tax_bases(self):
+        """Series view of the tax bases."""
+        return pd.Series(self.tax_bases_array, index=self.index, copy=False)
+
+    @property
+    def sum_of_cash_flows(self):
+        return pd.Series(self.sum_of_cash_flows_array, index=self.index)
+
+    @property
+    def cumsum_of_cash_flows(self):
+        return pd.Series(self.sum_of_cash_flows_array.cumsum(), index=self.index)
+
+    @property
+    def yearly_cumsum_of_cash_flows(self):
+        """Cumulative cash flow at the end of each year (index years), e.g. to compare scenarios of any resolution."""
+        periods_per_year = PERIODS_PER_YEAR[self.resolution]
+        cumsum = self.sum_of_cash_flows_array.cumsum()[periods_per_year - 1::periods_per_year]
+        return pd.Series(cumsum, index=pd.Index(range(len(cumsum)), name="Jahre"))
+
+    def __repr__(self):
+        return "{}(npv={:.2f}, irr={:.4f}, payback_period={:.2f}, periods={})".format(
+            type(self).__name__, self.npv, self.irr, self.payback_period, len(self.periods))
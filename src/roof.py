@@ -0,0 +1,193 @@
+"""
+Hourly yield of PV installations with several sub-arrays (e.g. east/west roofs or several strings).
+
+Every installation has a list of sub-arrays with their own size, orientation and tilt. The hourly yields of all
+sub-arrays of all installations are calculated in one vectorized pass from a synthetic sun geometry (solar position
+and irradiance of a typical year), summed per installation and clipped at the inverter power. The yield is calibrated
+with the full load hours of a reference array facing south with a tilt of 30°, so a single reference array without
+inverter limit gives exactly pv_power * annual_fullload_hours as before. The combined hourly profile and a household
+load profile give the self-consumption rate, so the results can be passed to calculate_solar_pv_economics.
+
+Orientations are compass azimuths in degree (north 0, east 90, south 180, west 270), tilts are degree from the
+horizontal.
+"""
+import numpy as np
+
+from .cache import resource
+from .tariffs import hourly_energy_flows
+
+
+HOURS = 8760
+DEFAULT_LATITUDE = 48.2
+REFERENCE_AZIMUTH = 180.
+REFERENCE_TILT = 30.
+
+# relative consumption of a household per hour of the day (morning and evening peaks)
+HOUSEHOLD_DAILY_PROFILE = np.array([
+    0.45, 0.38, 0.35, 0.34, 0.35, 0.42, 0.65, 0.95, 1.00, 0.90, 0.85, 0.90,
+    1.05, 1.00, 0.88, 0.82, 0.90, 1.10, 1.45, 1.65, 1.55, 1.30, 0.95, 0.65,
+])
+
+# clearness (share of the clear-sky irradiance) and diffuse fraction of clear, mixed and overcast days
+DAY_TYPES = np.array([[1.0, 0.2], [0.6, 0.5], [0.25, 1.0]])
+DAY_TYPE_PROBABILITIES = (0.4, 0.35, 0.25)
+
+
+@resource
+def sun_geometry(latitude=DEFAULT_LATITUDE, hours=HOURS, seed=0):
+    """
+    Synthetic sun geometry of a typical year in hourly resolution (solar time). The clear-sky irradiance is reduced
+    on mixed and overcast days, which are drawn reproducibly with seed, so the peaks of the production are realistic
+    for the inverter clipping.
+
+    Args:
+        latitude: latitude in degree
+        hours: number of hours
+        seed: seed of the sequence of day types
+
+    Returns:
+        tuple: unit vectors to the sun (hours x 3, east/north/up), the direct and the diffuse horizontal irradiance
+        in W/m²
+    """
+    t = np.arange(hours, dtype=np.float64)
+    day = t // 24
+    hour_angle = np.radians(15. * (t % 24 + 0.5 - 12))
+    declination = np.radians(23.45) * np.sin(2 * np.pi * (285 + day) / 365)
+    phi = np.radians(latitude)
+
+    sun = np.stack([
+        -np.cos(declination) * np.sin(hour_angle),
+        np.cos(phi) * np.sin(declination) - np.sin(phi) * np.cos(declination) * np.cos(hour_angle),
+        np.sin(phi) * np.sin(declination) + np.cos(phi) * np.cos(declination) * np.cos(hour_angle),
+    ], axis=1)
+
+    # clear-sky global horizontal irradiance from the direct normal irradiance (Meinel)
+    up = sun[:, 2]
+    with np.errstate(divide="ignore", over="ignore"):
+        air_mass = np.where(up > 0, 1 / np.maximum(up, 0.01), np.inf)
+        dni = 1353. * 0.7 ** (air_mass ** 0.678)
+    ghi = np.where(up > 0, dni * up + 0.1 * dni, 0.)
+
+    n_days = int(day[-1]) + 1
+    day_types = np.random.default_rng(seed).choice(len(DAY_TYPES), size=n_days, p=DAY_TYPE_PROBABILITIES)
+    clearness, diffuse_fraction = DAY_TYPES[day_types[day.astype(int)]].T
+    ghi = ghi * clearness
+    direct, diffuse = (1 - diffuse_fraction) * ghi, diffuse_fraction * ghi
+
+    for a in (sun, direct, diffuse):
+        a.setflags(write=False)
+    return sun, direct, diffuse
+
+
+def plane_of_array_irradiance(azimuth, tilt, latitude=DEFAULT_LATITUDE, albedo=0.2):
+    """
+    Hourly irradiance on tilted planes (isotropic sky).
+
+    Args:
+        azimuth: array of compass azimuths in degree (one per plane)
+        tilt: array of tilts in degree (one per plane)
+        latitude: latitude in degree
+        albedo: reflectance of the ground
+
+    Returns:
+        np.ndarray (hours x planes) in W/m²
+    """
+    sun, direct, diffuse = sun_geometry(latitude)
+    azimuth = np.radians(np.atleast_1d(np.asarray(azimuth, dtype=np.float64)))
+    tilt = np.radians(np.atleast_1d(np.asarray(tilt, dtype=np.float64)))
+    normals = np.stack([np.sin(tilt) * np.sin(azimuth), np.sin(tilt) * np.cos(azimuth), np.cos(tilt)])
+
+    up = np.maximum(sun[:, 2], 0.05)
+    cos_incidence = np.maximum(sun @ normals, 0.)
+
+    return ((direct / up)[:, np.newaxis] * cos_incidence +
+            diffuse[:, np.newaxis] * (1 + np.cos(tilt)) / 2 +
+            (albedo * (direct + diffuse))[:, np.newaxis] * (1 - np.cos(tilt)) / 2)
+
+
+def _flatten(installations):
+    """Sub-arrays of all installations as flat arrays and the index of their installation."""
+    sub_arrays = [(i, s) for i, installation in enumerate(installations) for s in installation["sub_arrays"]]
+    if not sub_arrays:
+        raise ValueError("Every installation needs at least one sub-array")
+    index = np.array([i for i, _ in sub_arrays])
+    pv_power, azimuth, tilt = (np.array([s[k] for _, s in sub_arrays], dtype=np.float64)
+                               for k in ("pv_power", "azimuth", "tilt"))
+    return index, pv_power, azimuth, tilt
+
+
+def simulate_installations(installations, annual_fullload_hours=1000., latitude=DEFAULT_LATITUDE, **kwargs):
+    """
+    Hourly AC production of installations with several sub-arrays.
+
+    Args:
+        installations: list of dicts with the key "sub_arrays" (list of dicts with "pv_power" in kWp, "azimuth" and
+                       "tilt" in degree) and optionally "inverter_power" in kW (None or 0 for no limit)
+        annual_fullload_hours: full load hours of the reference array (south, tilt 30°) in h
+        latitude: latitude in degree
+        **kwargs: passed to plane_of_array_irradiance
+
+    Returns:
+        np.ndarray (installations x hours) with the production in kWh per hour
+    """
+    index, pv_power, azimuth, tilt = _flatten(installations)
+
+    irradiance = plane_of_array_irradiance(np.append(azimuth, REFERENCE_AZIMUTH), np.append(tilt, REFERENCE_TILT),
+                                           latitude, **kwargs)
+    scale = annual_fullload_hours / irradiance[:, -1].sum()
+    dc = irradiance[:, :-1] * (scale * pv_power)
+
+    # sum of the sub-arrays per installation
+    assignment = np.zeros((len(index), len(installations)))
+    assignment[np.arange(len(index)), index] = 1.
+    production = (dc @ assignment).T
+
+    inverter_power = np.array([installation.get("inverter_power") or np.inf for installation in installations],
+                              dtype=np.float64)
+    return np.minimum(production, inverter_power[:, np.newaxis])
+
+
+def household_load_profile(annual_consumption, hours=HOURS):
+    """
+    Synthetic hourly load profile of a household with daily peaks and a higher consumption in winter.
+
+    Args:
+        annual_consumption: consumption in kWh per year (scalar or array of n installations)
+
+    Returns:
+        np.ndarray (hours,) or (n x hours) in kWh per hour
+    """
+    t = np.arange(hours)
+    profile = HOUSEHOLD_DAILY_PROFILE[t % 24] * (1 + 0.2 * np.cos(2 * np.pi * (t // 24 - 15) / 365))
+    profile = profile / profile.sum()
+    return np.multiply.outer(np.asarray(annual_consumption, dtype=np.float64), profile)
+
+
+def economics_inputs(installations, annual_consumption=None, **kwargs):
+    """
+    Inputs of calculate_solar_pv_economics(_batch) for the installations.
+
+    Args:
+        installations: see simulate_installations
+        annual_consumption: consumption in kWh per year (scalar or one per installation); if given the
+                            self-consumption rate is calculated from the hourly profiles
+        **kwargs: passed to simulate_installations
+
+    Returns:
+        dict with arrays (one value per installation) of the installed power "pv_power" in kWp, the
+        "annual_electricity_production" in kWh and optionally the "self_consumption_rate"
+    """
+    production = simulate_installations(installations, **kwargs)
+    annual_production = production.sum(axis=1)
+    inputs = {
+        "pv_power": np.array([sum(s["pv_power"] for s in installation["sub_arrays"])
+                              for installation in installations], dtype=np.float64),
+        "annual_electricity_production": annual_production,
+    }
+    if annual_consumption is not None:
+        consumption = household_load_profile(annual_consumption, production.shape[1])
+        self_consumption, _, _ = hourly_energy_flows(production, consumption)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            inputs["self_consumption_rate"] = np.where(annual_production > 0,
+                                                       self_consumption.sum(axis=1) / annual_production, 0.)
+    return inputs
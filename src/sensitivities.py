@@ -0,0 +1,136 @@
+"""
+Closed-form sensitivities of NPV and IRR with respect to the inputs of calculate_solar_pv_economics.
+
+The yearly cash flow of the model is
+
+    CF_t = [t = 0] * (subsidy - system_cost) + Y
+    Y = A * e * s + A * (1 - s) * f - taxed * tax_rate * (1 - s) * (A * f - system_cost / N)
+
+with A the annual electricity production, e the electricity rate, f the feed-in tarif, s the self-consumption rate
+and N the depreciation period. The NPV is -system_cost + subsidy + D(r) * Y with D(r) the sum of the discount factors,
+so all partial derivatives are available in closed form. The IRR sensitivities follow from the implicit function
+theorem: dIRR/dx = -(dNPV/dx) / (dNPV/dr), both evaluated at r = IRR.
+
+The taxation switches when pv_power exceeds tax_power_threshold or the feed-in exceeds tax_feedin_threshold. At this
+switch the NPV jumps, so the derivatives of pv_power and the thresholds are zero and the jump is reported separately.
+The depreciation period is an integer, its sensitivity is the difference to one additional year.
+"""
+import numpy as np
+
+
+INPUTS = ("system_cost", "subsidy", "pv_power", "annual_electricity_production", "electricity_rate", "feed_in_tarif",
+          "interest_rate", "depreciation_period", "self_consumption_rate", "tax_power_threshold",
+          "tax_feedin_threshold", "tax_rate")
+
+
+def _annuity_factor(rate, n_years):
+    """Sum of the discount factors for the years 0, ..., n_years and its derivative with respect to the rate."""
+    rate = np.asarray(rate, dtype=np.float64)[..., np.newaxis]
+    t = np.arange(n_years + 1, dtype=np.float64)
+    d = ((1 + rate) ** -t).sum(axis=-1)
+    d_rate = (-t * (1 + rate) ** (-t - 1)).sum(axis=-1)
+    return d, d_rate
+
+
+def _gradient(rate, taxed, system_cost, annual_electricity_production, electricity_rate, feed_in_tarif,
+              depreciation_period, self_consumption_rate, tax_rate):
+    """Partial derivatives of the NPV at the discount rate rate."""
+    a, e, f, s, c, n = (annual_electricity_production, electricity_rate, feed_in_tarif, self_consumption_rate,
+                        system_cost, depreciation_period)
+    tau = taxed * tax_rate
+    tax_base = a * f - c / n
+    annual = a * e * s + a * (1 - s) * f - tau * (1 - s) * tax_base
+
+    d, d_rate = _annuity_factor(rate, depreciation_period)
+    d_next, _ = _annuity_factor(rate, depreciation_period + 1)
+    annual_next = a * e * s + a * (1 - s) * f - tau * (1 - s) * (a * f - c / (n + 1))
+    zero = np.zeros_like(annual)
+
+    return {
+        "system_cost": -1 + d * tau * (1 - s) / n,
+        "subsidy": 1 + zero,
+        "pv_power": zero,
+        "annual_electricity_production": d * (e * s + (1 - s) * f * (1 - tau)),
+        "electricity_rate": d * a * s,
+        "feed_in_tarif": d * a * (1 - s) * (1 - tau),
+        "interest_rate": d_rate * annual,
+        "depreciation_period": d_next * annual_next - d * annual,
+        "self_consumption_rate": d * (a * e - a * f + tau * tax_base),
+        "tax_power_threshold": zero,
+        "tax_feedin_threshold": zero,
+        "tax_rate": 0. - d * taxed * (1 - s) * tax_base,
+    }
+
+
+def elasticities(gradient, inputs, value):
+    """Elasticities dvalue/dx * x / value for all inputs of the gradient (NaN if the value is zero)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {k: np.where(value != 0, g * np.asarray(inputs[k], dtype=np.float64) / value, np.nan)
+                for k, g in gradient.items()}
+
+
+def calculate_sensitivities(inputs, taxed, npv, irr):
+    """
+    Calculate the sensitivities of the NPV and the IRR for one or many scenarios.
+
+    Args:
+        inputs: dict with the (broadcast) inputs of calculate_solar_pv_economics_batch
+        taxed: whether the feed-in is taxed
+        npv: NPV of the scenarios
+        irr: IRR of the scenarios
+
+    Returns:
+        dict: A dictionary containing the following results:
+            - 'npv': dict with dNPV/dx in EUR per unit of each input.
+            - 'irr': dict with dIRR/dx per unit of each input (NaN if there is no IRR).
+            - 'npv_elasticity': dict with the elasticities of the NPV.
+            - 'irr_elasticity': dict with the elasticities of the IRR.
+            - 'tax_switch': dict with the jump of the NPV if the taxation switched ('npv_jump') and the values of
+              pv_power, self_consumption_rate and annual_electricity_production at which it switches if only this
+              input is changed (NaN if not possible).
+    """
+    taxed = np.asarray(taxed, dtype=np.float64)
+    args = dict(
+        taxed=taxed,
+        system_cost=inputs["system_cost"],
+        annual_electricity_production=inputs["annual_electricity_production"],
+        electricity_rate=inputs["electricity_rate"],
+        feed_in_tarif=inputs["feed_in_tarif"],
+        depreciation_period=inputs["depreciation_period"],
+        self_consumption_rate=inputs["self_consumption_rate"],
+        tax_rate=inputs["tax_rate"],
+    )
+    npv_gradient = _gradient(inputs["interest_rate"], **args)
+
+    valid_irr = ~np.isnan(irr)
+    at_irr = _gradient(np.where(valid_irr, irr, 0.), **args)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        irr_gradient = {k: np.where(valid_irr, -g / at_irr["interest_rate"], np.nan) for k, g in at_irr.items()}
+    irr_gradient["interest_rate"] = np.where(valid_irr, 0., np.nan)
+
+    # jump of the NPV at the switch of the taxation
+    a, s = inputs["annual_electricity_production"], inputs["self_consumption_rate"]
+    d, _ = _annuity_factor(inputs["interest_rate"], inputs["depreciation_period"])
+    tax = d * inputs["tax_rate"] * (1 - s) * (a * inputs["feed_in_tarif"] - inputs["system_cost"] /
+                                               inputs["depreciation_period"])
+    power_condition = inputs["pv_power"] > inputs["tax_power_threshold"]
+    feedin_condition = a * (1 - s) > inputs["tax_feedin_threshold"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        self_consumption_rate_at_switch = 1 - inputs["tax_feedin_threshold"] / a
+        annual_electricity_production_at_switch = inputs["tax_feedin_threshold"] / (1 - s)
+    tax_switch = {
+        "npv_jump": np.where(taxed > 0, tax, -tax),
+        "pv_power": np.where(feedin_condition, np.nan, inputs["tax_power_threshold"]),
+        "self_consumption_rate": np.where(
+            power_condition | (self_consumption_rate_at_switch < 0) | (self_consumption_rate_at_switch > 1),
+            np.nan, self_consumption_rate_at_switch),
+        "annual_electricity_production": np.where(power_condition, np.nan, annual_electricity_production_at_switch),
+    }
+
+    return {
+        "npv": npv_gradient,
+        "irr": irr_gradient,
+        "npv_elasticity": elasticities(npv_gradient, inputs, npv),
+        "irr_elasticity": elasticities(irr_gradient, inputs, irr),
+        "tax_switch": tax_switch,
+    }
@@ -0,0 +1,260 @@
+"""
+Precomputed response surfaces of the KPIs for instant feedback while the inputs are adjusted.
+
+A response surface stores the KPIs on a regular grid of the main inputs pv_power, self_consumption_rate and
+electricity_rate for fixed other inputs. It is built offline, stored as float32 .npy files (loaded memory-mapped)
+with the KPIs and an error bound per KPI and grid cell and a json file for the grid, and interpolated multilinearly.
+The exact result of calculate_solar_pv_economics should replace the approximation as soon as it is available.
+
+Build the default surface with:
+    python -m src.surface data/response_surface
+"""
+import json
+import os
+import sys
+import warnings
+
+import numpy as np
+
+from .functions import calculate_solar_pv_economics_batch
+from .lifetime import split_lifetime_inputs
+
+
+AXES = ("pv_power", "self_consumption_rate", "electricity_rate")
+SURFACE_KPIS = ("npv", "irr", "payback_period")
+
+DEFAULT_GRID = {
+    "pv_power": np.linspace(1, 50, 50),
+    "self_consumption_rate": np.linspace(0, 1, 21),
+    "electricity_rate": np.linspace(0.05, 0.60, 23),
+}
+
+# default inputs of the app (except the axes of the grid)
+DEFAULT_BASE_INPUTS = {
+    "annual_fullload_hours": 1000,
+    "system_cost": 10000,
+    "subsidy": 0,
+    "depreciation_period": 20,
+    "feed_in_tarif": 0.1,
+    "interest_rate": 0.05,
+    "tax_power_threshold": 25,
+    "tax_feedin_threshold": 12500,
+    "tax_rate": 0.42,
+}
+
+
+def _evaluate(base_inputs, pv_power, self_consumption_rate, electricity_rate, with_taxed=False):
+    """Exact KPIs of calculate_solar_pv_economics_batch for arrays of the axes (and whether the feed-in is taxed)."""
+    inputs = dict(base_inputs)
+    annual_fullload_hours = inputs.pop("annual_fullload_hours")
+    batch = calculate_solar_pv_economics_batch(
+        pv_power=pv_power,
+        annual_electricity_production=annual_fullload_hours * np.asarray(pv_power),
+        self_consumption_rate=self_consumption_rate,
+        electricity_rate=electricity_rate,
+        **inputs
+    )
+    kpis = np.stack([batch[k] for k in SURFACE_KPIS])
+    if with_taxed:
+        return kpis, batch["taxed"]
+    return kpis
+
+
+def _interpolate(values, grid, points):
+    """
+    Multilinear interpolation of values (kpis, n1, n2, ...) on a regular grid.
+
+    Args:
+        values: array with the KPIs along the first axis and one axis per grid axis
+        grid: list of 1-D arrays with the grid values of each axis
+        points: list of arrays with the coordinates of the points for each axis (broadcast against each other)
+
+    Returns:
+        array of shape (kpis, ...) with the interpolated values
+    """
+    points = np.broadcast_arrays(*[np.asarray(p, dtype=np.float64) for p in points])
+    lower = []
+    weights = []
+    for g, p in zip(grid, points):
+        i = np.clip(np.searchsorted(g, p, side="right") - 1, 0, len(g) - 2)
+        lower.append(i)
+        weights.append(np.clip((p - g[i]) / (g[i + 1] - g[i]), 0, 1))
+
+    result = 0.
+    for corner in np.ndindex(*(2,) * len(grid)):
+        index = tuple(i + c for i, c in zip(lower, corner))
+        weight = np.prod([w if c else 1 - w for w, c in zip(weights, corner)], axis=0)
+        result = result + weight * np.asarray(values[(slice(None),) + index], dtype=np.float64)
+    return result
+
+
+def _cell_error_bounds(values, axes, base_inputs, smooth_cells, samples):
+    """
+    Error bound of the interpolation per KPI and smooth grid cell (NaN for the other cells).
+
+    The deviation from the exact model is evaluated at samples points per axis of every cell (including the corners).
+    The bound is the maximal deviation plus the maximal change of the deviation between neighbouring samples (a margin
+    for the points in between) plus the float32 rounding of the stored values. A KPI which is not defined at a corner
+    of a cell (e.g. never paid back) is not approximated in the cell (NaN), cells where the KPI is not defined at a
+    sample get an infinite bound.
+    """
+    fractions = np.linspace(0, 1, samples)
+    deviations = np.empty((len(SURFACE_KPIS),) + smooth_cells.shape + (samples,) * len(axes))
+    for offset in np.ndindex(*(samples,) * len(axes)):
+        points = np.meshgrid(*[a[:-1] + fractions[o] * np.diff(a) for a, o in zip(axes, offset)], indexing="ij")
+        exact = _evaluate(base_inputs, *points)
+        approximation = _interpolate(values, axes, points)
+        deviation = np.abs(exact - approximation)
+        deviations[(Ellipsis,) + offset] = np.where(np.isnan(exact) != np.isnan(approximation), np.inf, deviation)
+
+    sample_axes = tuple(range(-len(axes), 0))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # cells without defined KPIs
+        maximum = np.nanmax(deviations, axis=sample_axes)
+        margin = np.nanmax([np.nanmax(np.abs(np.diff(deviations, axis=a)), axis=sample_axes) for a in sample_axes],
+                           axis=0)
+    margin = np.where(np.isnan(margin), 0., margin)
+    rounding = np.finfo(np.float32).eps * np.nanmax(np.abs(values.reshape(len(SURFACE_KPIS), -1)), axis=1)
+    with np.errstate(invalid="ignore"):
+        bounds = maximum + margin + rounding.reshape((-1,) + (1,) * len(axes))
+    defined = np.all([~np.isnan(values[(slice(None),) + tuple(slice(c, len(a) - 1 + c) for c, a in zip(corner, axes))])
+                      for corner in np.ndindex(*(2,) * len(axes))], axis=0)
+    return np.where(smooth_cells & defined, bounds, np.nan)
+
+
+def build_response_surface(path, base_inputs=None, grid=None, samples=5):
+    """
+    Build the response surface and store it in the directory path.
+
+    Grid cells in which the taxation switches are marked and not approximated. For all other cells an error bound of
+    every KPI is stored (see _cell_error_bounds), which holds for all points of the cell. Within a tax regime the NPV is
+    multilinear in the axes, so its error bound is only the float32 rounding; IRR and payback period are smooth but
+    not linear.
+
+    Args:
+        path: directory for the surface (created if necessary)
+        base_inputs: fixed inputs of calculate_solar_pv_economics and annual_fullload_hours (see DEFAULT_BASE_INPUTS)
+        grid: dict with the grid values for each axis (see DEFAULT_GRID)
+        samples: number of sample points per axis of a cell for the error bounds
+
+    Returns:
+        ResponseSurface
+    """
+    base_inputs = {**DEFAULT_BASE_INPUTS, **(base_inputs or {})}
+    grid = {**DEFAULT_GRID, **(grid or {})}
+    axes = [np.asarray(grid[a], dtype=np.float64) for a in AXES]
+
+    values, taxed = _evaluate(base_inputs, *np.meshgrid(*axes, indexing="ij"), with_taxed=True)
+    values = values.astype(np.float32)
+
+    # cells in which the taxation switches (tax_power_threshold, tax_feedin_threshold) have a jump and are not
+    # approximated; the feed-in is monotonic in every axis, so the corners of a cell show a switch within it
+    corners = [taxed[tuple(slice(c, len(a) - 1 + c) for c, a in zip(corner, axes))]
+               for corner in np.ndindex(*(2,) * len(axes))]
+    smooth_cells = np.all(corners == corners[0], axis=0)
+    error_bounds = _cell_error_bounds(values, axes, base_inputs, smooth_cells, samples)
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "kpis.npy"), values)
+    np.save(os.path.join(path, "smooth_cells.npy"), smooth_cells)
+    np.save(os.path.join(path, "error_bounds.npy"), error_bounds.astype(np.float32))
+    # the largest finite bound of all cells as overview
+    finite = np.where(np.isfinite(error_bounds), error_bounds, np.nan)
+    meta = {
+        "axes": {a: g.tolist() for a, g in zip(AXES, axes)},
+        "kpis": list(SURFACE_KPIS),
+        "base_inputs": base_inputs,
+        "max_error_bounds": {k: float(np.nanmax(b)) for k, b in zip(SURFACE_KPIS, finite)},
+    }
+    with open(os.path.join(path, "meta.json"), mode="w", encoding="utf8") as file:
+        json.dump(meta, file, indent=2)
+
+    return ResponseSurface(path)
+
+
+class ResponseSurface(object):
+    """
+    Memory-mapped response surface of the KPIs (see build_response_surface).
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), mode="r", encoding="utf8") as file:
+            meta = json.load(file)
+        self.values = np.load(os.path.join(path, "kpis.npy"), mmap_mode="r")
+        self.smooth_cells = np.load(os.path.join(path, "smooth_cells.npy"), mmap_mode="r")
+        self.cell_error_bounds = np.load(os.path.join(path, "error_bounds.npy"), mmap_mode="r")
+        self.grid = [np.asarray(meta["axes"][a]) for a in AXES]
+        self.kpis = meta["kpis"]
+        self.base_inputs = meta["base_inputs"]
+        self.max_error_bounds = meta["max_error_bounds"]
+
+    def covers(self, inputs):
+        """
+        Check whether the surface can approximate the inputs of calculate_solar_pv_economics, i.e. all other inputs
+        are equal to the base inputs and the axes are within a grid cell without a switch of the taxation.
+        """
+        # lifetime inputs are only supported without effect (e.g. an inverter replacement year without costs)
+        inputs, lifetime = split_lifetime_inputs(inputs)
+        if lifetime:
+            return False
+        base = dict(self.base_inputs)
+        if inputs["pv_power"] <= 0:
+            return False
+        annual_fullload_hours = inputs["annual_electricity_production"] / inputs["pv_power"]
+        if not np.isclose(annual_fullload_hours, base.pop("annual_fullload_hours")):
+            return False
+        for k, v in base.items():
+            if not np.isclose(inputs.get(k, v), v):
+                return False
+        if inputs.get("resolution", "1Y") != "1Y":
+            return False
+        if not all(g[0] <= inputs[a] <= g[-1] for a, g in zip(AXES, self.grid)):
+            return False
+        return bool(self.smooth_cells[self.cell(*[inputs[a] for a in AXES])])
+
+    def cell(self, pv_power, self_consumption_rate, electricity_rate):
+        """Index of the grid cell of (arrays of) the axes (points on a grid line belong to the upper cell)."""
+        return tuple(np.clip(np.searchsorted(g, p, side="right") - 1, 0, len(g) - 2)
+                     for g, p in zip(self.grid, [pv_power, self_consumption_rate, electricity_rate]))
+
+    def error_bounds(self, pv_power, self_consumption_rate, electricity_rate):
+        """
+        Error bounds of the approximation for (arrays of) the axes (NaN in cells which are not approximated).
+
+        Returns:
+            dict with an array per KPI ('npv', 'irr', 'payback_period')
+        """
+        cell = self.cell(pv_power, self_consumption_rate, electricity_rate)
+        return {k: np.asarray(self.cell_error_bounds[(i,) + cell], dtype=np.float64) for i, k in enumerate(self.kpis)}
+
+    def interpolate(self, pv_power, self_consumption_rate, electricity_rate):
+        """
+        Approximate KPIs for (arrays of) the axes.
+
+        Returns:
+            dict with an array per KPI ('npv', 'irr', 'payback_period')
+        """
+        values = _interpolate(self.values, self.grid, [pv_power, self_consumption_rate, electricity_rate])
+        return dict(zip(self.kpis, values))
+
+    def approximate(self, inputs):
+        """
+        Approximate KPIs for the inputs of calculate_solar_pv_economics.
+
+        Returns:
+            tuple: dicts with the approximated KPIs and their error bounds in the grid cell of the inputs (both NaN for
+            KPIs without a bound in the cell, e.g. if the investment is paid back only in a part of it) or None if
+            the inputs are not covered
+        """
+        if not self.covers(inputs):
+            return None
+        axes = [inputs[a] for a in AXES]
+        kpis, bounds = self.interpolate(*axes), self.error_bounds(*axes)
+        kpis = {k: float(v) if np.isfinite(bounds[k]) else np.nan for k, v in kpis.items()}
+        bounds = {k: float(v) if np.isfinite(v) else np.nan for k, v in bounds.items()}
+        return kpis, bounds
+
+
+if __name__ == "__main__":
+    surface = build_response_surface(sys.argv[1] if len(sys.argv) > 1 else "data/response_surface")
+    print("Maximal error bounds:", surface.max_error_bounds)
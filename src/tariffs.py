@@ -0,0 +1,193 @@
+"""
+Hourly revenue engine for dynamic tariffs and spot-price-indexed feed-in (direct marketing).
+
+Hourly prices are multiplied with the hourly energy flows of the PV system (self-consumption and feed-in) as float32
+arrays. The years of the depreciation horizon are processed one at a time from generators, so only one year of
+hourly data is held in memory. The yearly result has the columns of the cash flow table of
+calculate_solar_pv_economics and can be passed to it as yearly_revenues.
+"""
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+from .results import CASH_FLOW_COLUMNS, SAVINGS, FEEDIN
+
+
+REVENUE_COLUMNS = (CASH_FLOW_COLUMNS[SAVINGS], CASH_FLOW_COLUMNS[FEEDIN], "Produktion in kWh",
+                   "Eigenverbrauch in kWh", "Einspeisung in kWh")
+
+
+def load_hourly_prices(path, column=None, unit="EUR/kWh"):
+    """
+    Load an hourly price series of one year from a local file.
+
+    Args:
+        path: .npy file (loaded memory-mapped) or csv file in the format of the app downloads (sep ";", decimal ",",
+              first column the time stamps)
+        column: price column of the csv file (default the first column)
+        unit: "EUR/kWh" or "EUR/MWh"
+
+    Returns:
+        np.ndarray (float32) with the prices in EUR/kWh
+    """
+    if os.path.splitext(path)[1] == ".npy":
+        prices = np.load(path, mmap_mode="r")
+    else:
+        df = pd.read_csv(path, sep=";", decimal=",", index_col=0)
+        prices = df[column].to_numpy() if column is not None else df.iloc[:, 0].to_numpy()
+
+    if unit == "EUR/MWh":
+        return np.asarray(prices, dtype=np.float32) / np.float32(1000)
+    elif unit == "EUR/kWh":
+        return np.asarray(prices, dtype=np.float32)
+    else:
+        raise ValueError("Unit {} not supported".format(unit))
+
+
+def iter_hourly_prices(source, n_years, **kwargs):
+    """
+    Yield the hourly prices for n_years years, one year at a time.
+
+    Args:
+        source: list of yearly price files (see load_hourly_prices) or arrays; repeated cyclically if the horizon is
+                longer than the available years. A single file or array is used for every year.
+        n_years: number of years
+        **kwargs: passed to load_hourly_prices
+
+    Yields:
+        np.ndarray (float32) with the prices of one year in EUR/kWh
+    """
+    if isinstance(source, (str, np.ndarray)):
+        source = [source]
+    for item in itertools.islice(itertools.cycle(source), n_years):
+        if isinstance(item, str):
+            yield load_hourly_prices(item, **kwargs)
+        else:
+            yield np.asarray(item, dtype=np.float32)
+
+
+def _iter_yearly(values, n_years):
+    """Yield a float32 array per year from a single array (every year the same) or an iterable of yearly arrays."""
+    if isinstance(values, np.ndarray):
+        values = np.asarray(values, dtype=np.float32)
+        return itertools.repeat(values, n_years)
+    return (np.asarray(v, dtype=np.float32) for v in itertools.islice(values, n_years))
+
+
+def hourly_energy_flows(production, consumption):
+    """
+    Split the hourly production into self-consumption and feed-in and calculate the grid import.
+
+    Args:
+        production: hourly production in kWh
+        consumption: hourly consumption in kWh
+
+    Returns:
+        tuple of float32 arrays: self-consumption, feed-in and grid import in kWh
+    """
+    self_consumption = np.minimum(production, consumption)
+    return self_consumption, production - self_consumption, consumption - self_consumption
+
+
+def iter_yearly_revenues(production, consumption, feed_in_prices, import_prices, n_years,
+                         feed_in_markup=0., import_markup=0.):
+    """
+    Calculate the revenues year by year.
+
+    Args:
+        production: hourly production in kWh (one array for all years or an iterable of yearly arrays)
+        consumption: hourly consumption in kWh (one array for all years or an iterable of yearly arrays)
+        feed_in_prices: iterable of yearly hourly feed-in prices in EUR/kWh (see iter_hourly_prices)
+        import_prices: iterable of yearly hourly prices of the grid import in EUR/kWh (see iter_hourly_prices)
+        n_years: number of years
+        feed_in_markup: added to the feed-in prices in EUR/kWh (e.g. a negative direct marketing fee)
+        import_markup: added to the import prices in EUR/kWh (e.g. grid fees and taxes)
+
+    Yields:
+        tuple: savings and feed-in revenues in EUR, production, self-consumption and feed-in in kWh of one year
+    """
+    for p, c, feed_in_price, import_price in zip(_iter_yearly(production, n_years), _iter_yearly(consumption, n_years),
+                                                  feed_in_prices, import_prices):
+        hours = len(p)
+        if (len(c) < hours) or (len(feed_in_price) < hours) or (len(import_price) < hours):
+            raise ValueError("Hourly prices and consumption must cover the {} hours of the production".format(hours))
+        self_consumption, feed_in, _ = hourly_energy_flows(p, c[:hours])
+
+        savings = np.dot(self_consumption, import_price[:hours] + np.float32(import_markup))
+        revenues = np.dot(feed_in, feed_in_price[:hours] + np.float32(feed_in_markup))
+        yield (float(savings), float(revenues), float(p.sum(dtype=np.float64)),
+               float(self_consumption.sum(dtype=np.float64)), float(feed_in.sum(dtype=np.float64)))
+
+
+def price_kwargs(dynamic_tariff, feed_in_kwargs=None, import_kwargs=None, **kwargs):
+    """
+    Arguments of load_hourly_prices for the feed-in and the import prices, so the sources can have different units
+    or columns (e.g. spot prices in EUR/MWh and a retail tariff in EUR/kWh).
+
+    Args:
+        dynamic_tariff: whether the import prices are the feed-in prices (import_kwargs default to feed_in_kwargs)
+        feed_in_kwargs: dict for the feed-in prices
+        import_kwargs: dict for the import prices
+        **kwargs: common arguments of both sources
+
+    Returns:
+        tuple of dicts for the feed-in and the import prices
+    """
+    if (import_kwargs is None) and dynamic_tariff:
+        import_kwargs = feed_in_kwargs
+    return {**kwargs, **(feed_in_kwargs or {})}, {**kwargs, **(import_kwargs or {})}
+
+
+def yearly_revenues(production, consumption, feed_in_prices, import_prices=None, n_years=21,
+                    feed_in_markup=0., import_markup=0., feed_in_kwargs=None, import_kwargs=None, **kwargs):
+    """
+    Yearly revenues of a PV system with hourly prices over the depreciation horizon.
+
+    Args:
+        production: hourly production in kWh (one array for all years or an iterable of yearly arrays)
+        consumption: hourly consumption in kWh (one array for all years or an iterable of yearly arrays)
+        feed_in_prices: source of the hourly feed-in prices (see iter_hourly_prices)
+        import_prices: source of the hourly import prices (default the feed-in prices, i.e. a dynamic tariff)
+        n_years: number of years, i.e. depreciation_period + 1
+        feed_in_markup: added to the feed-in prices in EUR/kWh
+        import_markup: added to the import prices in EUR/kWh
+        feed_in_kwargs: dict passed to load_hourly_prices for the feed-in prices (e.g. {"unit": "EUR/MWh"} for spot
+                        prices)
+        import_kwargs: dict passed to load_hourly_prices for the import prices (default feed_in_kwargs if the import
+                       prices are the feed-in prices)
+        **kwargs: passed to load_hourly_prices for both sources (overridden by feed_in_kwargs and import_kwargs)
+
+    Returns:
+        pd.DataFrame with the years as index and the columns REVENUE_COLUMNS
+    """
+    feed_in_kwargs, import_kwargs = price_kwargs(import_prices is None, feed_in_kwargs, import_kwargs, **kwargs)
+    if import_prices is None:
+        import_prices = feed_in_prices
+    rows = list(iter_yearly_revenues(
+        production, consumption,
+        iter_hourly_prices(feed_in_prices, n_years, **feed_in_kwargs),
+        iter_hourly_prices(import_prices, n_years, **import_kwargs),
+        n_years, feed_in_markup, import_markup
+    ))
+    return pd.DataFrame(rows, index=pd.Index(range(len(rows)), name="Jahre"), columns=list(REVENUE_COLUMNS))
+
+
+def economics_inputs_from_revenues(revenues):
+    """
+    Average inputs of calculate_solar_pv_economics which correspond to the yearly revenues, i.e. the mean annual
+    production, the realised self-consumption rate and the effective electricity rate and feed-in tarif. Pass them
+    together with yearly_revenues=revenues.
+    """
+    production = float(revenues["Produktion in kWh"].sum())
+    self_consumption = float(revenues["Eigenverbrauch in kWh"].sum())
+    feed_in = float(revenues["Einspeisung in kWh"].sum())
+    savings = float(revenues[REVENUE_COLUMNS[0]].sum())
+    feed_in_revenues = float(revenues[REVENUE_COLUMNS[1]].sum())
+    return {
+        "annual_electricity_production": production / len(revenues),
+        "self_consumption_rate": self_consumption / production if production > 0 else 0.,
+        "electricity_rate": savings / self_consumption if self_consumption > 0 else 0.,
+        "feed_in_tarif": feed_in_revenues / feed_in if feed_in > 0 else 0.,
+    }
@@ -0,0 +1,143 @@
+"""
+Least-squares trends for all columns of a DataFrame at once.
+
+The trends are fitted in closed form with NumPy (no scipy). Missing values are ignored column by column. Datetime
+indices are converted to days, so the slopes are given per day for time series and per index step otherwise.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _numeric_index(index):
+    """Convert the index into float x-values (days for datetime indices)."""
+    if isinstance(index, pd.DatetimeIndex):
+        return index.values.astype("datetime64[D]").astype(np.float64)
+    if isinstance(index, pd.PeriodIndex):
+        return index.to_timestamp().values.astype("datetime64[D]").astype(np.float64)
+    return np.asarray(index, dtype=np.float64)
+
+
+def _as_frame(data):
+    if isinstance(data, pd.Series):
+        return data.to_frame()
+    return data
+
+
+def _regression(n, sx, sy, sxx, sxy):
+    """Slope and intercept from the sums of a least-squares regression."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx ** 2)
+        intercept = (sy - slope * sx) / n
+    return slope, intercept
+
+
+def fit_trends(data):
+    """
+    Fit a linear trend y = intercept + slope * x for every column.
+
+    Args:
+        data: DataFrame or Series
+
+    Returns:
+        DataFrame with the rows "slope", "intercept" (at the first index value) and "r" and one column per series
+    """
+    df = _as_frame(data)
+    x = _numeric_index(df.index)
+    x = (x - x[0])[:, np.newaxis]
+    y = df.to_numpy(dtype=np.float64)
+
+    w = ~np.isnan(y)
+    y0 = np.where(w, y, 0.)
+    xw = np.where(w, x, 0.)
+
+    n = w.sum(axis=0)
+    sx = xw.sum(axis=0)
+    sy = y0.sum(axis=0)
+    sxx = (xw ** 2).sum(axis=0)
+    sxy = (xw * y0).sum(axis=0)
+    syy = (y0 ** 2).sum(axis=0)
+    slope, intercept = _regression(n, sx, sy, sxx, sxy)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = (n * sxy - sx * sy) / np.sqrt((n * sxx - sx ** 2) * (n * syy - sy ** 2))
+
+    return pd.DataFrame([slope, intercept, r], index=["slope", "intercept", "r"], columns=df.columns)
+
+
+def trend_endpoints(data):
+    """
+    Fitted trend values at the first and last index value of every column.
+
+    Returns:
+        DataFrame with two rows (first and last index) and one column per series
+    """
+    df = _as_frame(data)
+    trends = fit_trends(df)
+    x = _numeric_index(df.index)
+    x_endpoints = np.array([0., x[-1] - x[0]])[:, np.newaxis]
+    y_endpoints = trends.loc["intercept"].to_numpy() + trends.loc["slope"].to_numpy() * x_endpoints
+    return pd.DataFrame(y_endpoints, index=df.index[[0, -1]], columns=df.columns)
+
+
+def rolling_trends(data, window):
+    """
+    Rolling least-squares trends over the last window values.
+
+    Args:
+        data: DataFrame or Series
+        window: number of values per regression
+
+    Returns:
+        DataFrame with the fitted trend value at the end of each window (NaN for the first window-1 values)
+    """
+    df = _as_frame(data)
+    x = _numeric_index(df.index)
+    x = (x - x[0])[:, np.newaxis]
+    y = df.to_numpy(dtype=np.float64)
+
+    w = ~np.isnan(y)
+    y0 = np.where(w, y, 0.)
+    xw = np.where(w, x, 0.)
+
+    def rolling_sum(values):
+        cumsum = np.cumsum(values, axis=0)
+        result = cumsum.copy()
+        result[window:] = cumsum[window:] - cumsum[:-window]
+        return result
+
+    n = rolling_sum(w.astype(np.float64))
+    slope, intercept = _regression(n, rolling_sum(xw), rolling_sum(y0), rolling_sum(xw ** 2), rolling_sum(xw * y0))
+
+    fitted = intercept + slope * x
+    fitted[:window - 1] = np.nan
+    return pd.DataFrame(fitted, index=df.index, columns=df.columns)
+
+
+def trend_add_on(data, colors=None, width=1, suffix=" (Trend)", window=None):
+    """
+    Build the add_on dictionary for fig_and_link with one trend line per column.
+
+    Args:
+        data: DataFrame or Series
+        colors: dict with a line color per column (default "black")
+        width: line width
+        suffix: added to the column name for the legend
+        window: if given, rolling trends over window values are plotted instead of the overall trend
+
+    Returns:
+        dict which can be passed as add_on to fig_and_link
+    """
+    df = _as_frame(data)
+    trends = trend_endpoints(df) if window is None else rolling_trends(df, window)
+    if colors is None:
+        colors = {}
+
+    add_on = {}
+    for i, c in enumerate(trends.columns):
+        add_on["line_trend_{}".format(i)] = {
+            "data": trends[c],
+            "name": "{}{}".format(c, suffix),
+            "color": colors.get(c, "black"),
+            "width": width,
+        }
+    return add_on
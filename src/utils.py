@@ -1,14 +1,21 @@
 import streamlit as st
 from src.plot import Plot
+from src.trend import trend_endpoints
 import plotly.graph_objects as go
 import pandas as pd
-import scipy.stats as stats
-import datetime as dt
 import base64
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 
 p = Plot().plotter
 
+# shared pool for the evaluation of the scenarios and the figure builds of all sessions
+executor = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="pv_calculator")
+
+# st.fragment reruns only the decorated function when its own widgets change (streamlit >= 1.37)
+fragment = st.fragment
+
 
 def render_svg(svg):
     """Renders the given svg string."""
@@ -33,16 +40,13 @@ def get_st_download_link(df, name="data"):
     # st.markdown(get_table_download_link_csv(df), unsafe_allow_html=True)
 
 
-def fig_and_link(df, add_on=None, download_link=True, **kwargs):
+def make_fig(df, add_on=None, **kwargs):
     """
-    Make a plot and
-    Args:
-        df:
-        add_on:
-        **kwargs:
+    Make the plotly figure of fig_and_link without showing it. Does not use streamlit, so it can run in a worker
+    thread (see executor).
 
     Returns:
-
+        fig, df: the figure and the data including the add on data (for the download)
     """
     df = df.copy()
 
@@ -62,11 +66,6 @@ def fig_and_link(df, add_on=None, download_link=True, **kwargs):
     except KeyError:
         resampling = "1Y"
 
-    try:
-        use_container_width = kwargs["use_container_width"]
-    except KeyError:
-        use_container_width = True
-
     fig = p(df, **kwargs)
 
     from .plot import hover_datetime_format
@@ -115,7 +114,31 @@ def fig_and_link(df, add_on=None, download_link=True, **kwargs):
 
     fig.update_layout(height=600, width=400)
 
-    st.plotly_chart(fig, use_container_width=use_container_width)
+    return fig, df
+
+
+def fig_and_link(df, add_on=None, download_link=True, fig=None, key=None, **kwargs):
+    """
+    Make a plot and
+    Args:
+        df:
+        add_on:
+        fig: figure already built with make_fig (df is then the data returned by make_fig)
+        key: unique key of the chart
+        **kwargs:
+
+    Returns:
+
+    """
+    if fig is None:
+        fig, df = make_fig(df, add_on, **kwargs)
+
+    try:
+        use_container_width = kwargs["use_container_width"]
+    except KeyError:
+        use_container_width = True
+
+    st.plotly_chart(fig, use_container_width=use_container_width, key=key)
 
     if download_link:
         from io import BytesIO
@@ -143,19 +166,11 @@ def fig_and_link(df, add_on=None, download_link=True, **kwargs):
 
 
 def get_trend_of_ts(df):
-    df = df.copy()
-    idx = df.index
-
-    # To perform the linear regression we need the dates to be numeric
-    df.index = df.index.map(dt.date.toordinal)
-    # Perform linear regression
-    slope, y0, r, p, stderr = stats.linregress(df.index, df.iloc[:, 0])
-
-    # x co-ordinates for the start and end of the line
-    x_endpoints = pd.Series([df.index[0], df.index[-1]])
-
-    # Compute predicted values from linear regression
-    y_endpoints = y0 + slope * x_endpoints
+    """
+    Linear trend of the first column of the time series df (see src.trend, trend_endpoints and trend_add_on give the
+    trends of all columns).
 
-    s1 = pd.Series(index=[idx[0], idx[-1]], data=y_endpoints.values)
-    return s1
\ No newline at end of file
+    Returns:
+        Series with the trend values at the first and the last index
+    """
+    return trend_endpoints(df).iloc[:, 0]
@@ -2,6 +2,18 @@ import streamlit as st
 from src.functions import *
 from src.utils import *
 import plotly.graph_objects as go
+import os
+from src.surface import ResponseSurface
+from src.report import build_report, report_fingerprint
+
+
+@st.cache_resource
+def load_response_surface(path="data/response_surface"):
+    """Load the response surface (build it with: python -m src.surface) if it exists."""
+    if os.path.exists(os.path.join(path, "meta.json")):
+        return ResponseSurface(path)
+    return None
+
 
 st.set_page_config(
     layout="centered", page_icon="⚡", page_title="PV App"
@@ -39,41 +51,9 @@ st.image(image, caption='Schematische Beschreibung der Berechnungsmethode. ')
 # render_svg(line_string)
 
 # input data
-st.markdown("## Annahmen")
 number_of_simulation = st.radio(label="Anzahl an Szenarien", options=[1, 2, 3])
-# array of dicts for the input
-inputs = [dict() for x in range(number_of_simulation)]
 colors_scenarios = ["blue", "orange", "green"]
-
-tab1, tab2, tab3 = st.tabs(["Technisch", "Wirtschaftlich", "Steuerlich"])
-
-with tab1:
-    st.markdown("Technische Annahmen")
-
-    cols = st.columns(number_of_simulation)
-    for c, i, color in zip(cols, range(number_of_simulation), colors_scenarios):
-        with c:
-            d = get_technical_inputs(c, color)
-            inputs[i] = {**inputs[i], **d}
-
-
-with tab2:
-    st.markdown("Wirtschafliche Annahmen")
-
-    cols = st.columns(number_of_simulation)
-    for c, i, color in zip(cols, range(number_of_simulation), colors_scenarios):
-        with c:
-            d = get_economic_inputs(c, color)
-            inputs[i] = {**inputs[i], **d}
-
-with tab3:
-    st.markdown("Steuerlichen Annahmen")
-
-    cols = st.columns(number_of_simulation)
-    for c, i, color in zip(cols, range(number_of_simulation), colors_scenarios):
-        with c:
-            d = get_tax_inputs(c, color)
-            inputs[i] = {**inputs[i], **d}
+scenario_names = ["Szenario {}".format((int(x+1))) for x in range(number_of_simulation)]
 
 # to do
 # - miete
@@ -81,29 +61,89 @@ with tab3:
 # - fremdfinanzierung
 # - download als csv
 
-st.markdown("## Ergebnis")
+surface = load_response_surface()
+scenario_inputs = st.session_state.setdefault("scenario_inputs", {})
+economics = st.session_state.setdefault("economics", {})
+
+# evaluate all scenarios with the inputs of the last run in parallel, the fragments pick up the results
+prefetched = {
+    i: (inputs, executor.submit(evaluate_scenario, inputs))
+    for i, inputs in scenario_inputs.items() if i < number_of_simulation
+}
+
+
+@fragment
+def scenario_fragment(i, color, prefetch=None):
+    """Inputs and results of one scenario, rerun on its own when its inputs change."""
+    key = "scenario_{}".format(i)
+
+    st.markdown("## Annahmen")
+    tab1, tab2, tab3, tab4 = st.tabs(["Technisch", "Wirtschaftlich", "Steuerlich", "Lebensdauer"])
+    inputs = {}
+    with tab1:
+        st.markdown("Technische Annahmen")
+        inputs.update(get_technical_inputs(tab1, color, key))
+    with tab2:
+        st.markdown("Wirtschafliche Annahmen")
+        inputs.update(get_economic_inputs(tab2, color, key))
+    with tab3:
+        st.markdown("Steuerlichen Annahmen")
+        inputs.update(get_tax_inputs(tab3, color, key))
+    with tab4:
+        st.markdown("Annahmen über die Lebensdauer")
+        inputs.update(get_lifetime_inputs(tab4, color, key, inputs["depreciation_period"]))
+    scenario_inputs[i] = inputs
+
+    st.markdown("## Ergebnis")
+    if (prefetch is not None) and (prefetch[0] == inputs):
+        future = prefetch[1]
+    else:
+        future = executor.submit(evaluate_scenario, inputs)
+
+    # show approximated KPIs of the precomputed response surface until the exact calculation is done
+    approximation = st.empty()
+    if (surface is not None) and not future.done():
+        approximated = surface.approximate(inputs)
+        if approximated is not None:
+            with approximation.container():
+                show_approximate_kpis(*approximated, scenario_names[i])
+
+    economics[i], figures = future.result()
+    approximation.empty()
+    show_one_scenario(economics[i], key, figures)
 
-economics = [dict() for x in range(number_of_simulation)]
 
-scenario_names = ["Szenario {}".format((int(x+1))) for x in range(number_of_simulation)]
+result_tabs = st.tabs(scenario_names)
 
-cumulative_ncf = pd.DataFrame(columns=scenario_names)
-for i in range(number_of_simulation):
-    economics[i] = calculate_solar_pv_economics(**inputs[i])
-    cumulative_ncf.iloc[:, i] = economics[i]["net_cash_flows"].sum(axis="columns").cumsum()
+for result_tab, i in zip(result_tabs, range(number_of_simulation)):
+    with result_tab:
+        scenario_fragment(i, colors_scenarios[i], prefetched.get(i))
 
+# the comparison is outside of the fragments, so it is only updated on a full rerun of the script (e.g. the button)
 if number_of_simulation > 1:
+    st.markdown("## Vergleich")
+    st.caption("Änderungen innerhalb eines Szenarios werden erst mit \"Vergleich aktualisieren\" übernommen.")
+    st.button("Vergleich aktualisieren")
+    cumulative_ncf = pd.DataFrame({
+        name: economics[i].yearly_cumsum_of_cash_flows for i, name in enumerate(scenario_names)
+    })
     fig_and_link(
         cumulative_ncf / 1e3,
         title="Entwicklung des Netto-Cash-Flows aller Szenarien", unit="Tausend EUR", kind="line",
         download_link=False
     )
 
-result_tabs = st.tabs(scenario_names)
-
-for result_tab, i in zip(result_tabs, range(number_of_simulation)):
-    with result_tab:
-        show_one_scenario(economics[i], result_tab)
+st.markdown("## Bericht")
+if st.button("Bericht aller Szenarien erstellen"):
+    report_scenarios = {name: scenario_inputs[i] for i, name in enumerate(scenario_names)}
+    with st.spinner("Bericht wird erstellt..."):
+        report = build_report(report_scenarios)
+    st.download_button(
+        label="Bericht herunterladen (HTML)",
+        data=report.encode("utf-8"),
+        file_name="pv_bericht_{}.html".format(report_fingerprint(report_scenarios)[:8]),
+        mime="text/html",
+    )
 
 with st.expander("Haftungsausschluss"):
     st.markdown("""
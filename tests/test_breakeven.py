@@ -0,0 +1,55 @@
+import numpy as np
+
+from src.breakeven import break_even, break_even_limit
+from src.functions import calculate_solar_pv_economics_batch
+from src.lifetime import simulate_lifetime_batch
+
+
+INPUTS = {
+    "system_cost": 10000, "subsidy": 0, "pv_power": 10, "annual_electricity_production": 10000,
+    "electricity_rate": 0.15, "feed_in_tarif": 0.1, "interest_rate": 0.05, "depreciation_period": 20,
+    "self_consumption_rate": 0.3,
+}
+
+
+def test_break_even_values_have_zero_npv():
+    inputs = {**INPUTS, "system_cost": np.array([10000, 14000, 30000]), "electricity_rate": 0.3}
+    for name in ("system_cost", "feed_in_tarif", "electricity_rate"):
+        value = break_even(inputs, name)
+        npv = calculate_solar_pv_economics_batch(**{**inputs, name: value})["npv"]
+        assert np.allclose(npv, 0., atol=1e-4), name
+
+
+def test_break_even_of_an_irr_target():
+    value = break_even(INPUTS, "system_cost", irr=0.08)
+    assert np.isclose(calculate_solar_pv_economics_batch(**{**INPUTS, "system_cost": value})["irr"], 0.08)
+
+
+def test_monthly_and_lifetime_break_even_by_bisection():
+    lifetime = {"om_cost": 200, "degradation": 0.005}
+    for resolution in ("1Y", "1M"):
+        inputs = {**INPUTS, "resolution": resolution}
+        value = break_even(inputs, "feed_in_tarif", lifetime=lifetime)
+        npv = simulate_lifetime_batch({**inputs, "feed_in_tarif": value}, **lifetime)["npv"]
+        assert np.isclose(npv, 0., atol=1e-4)
+
+
+def test_limit_is_the_bound_if_every_value_breaks_even():
+    value, maximum = break_even_limit(INPUTS, "self_consumption_rate")
+    assert calculate_solar_pv_economics_batch(**{**INPUTS, "self_consumption_rate": 0.})["npv"] > 0
+    assert value == 0. and not maximum
+
+
+def test_limit_is_a_maximum_if_the_npv_falls():
+    inputs = {**INPUTS, "electricity_rate": 0.04, "feed_in_tarif": 0.15}
+    value, maximum = break_even_limit(inputs, "self_consumption_rate")
+    assert maximum and 0 < value < 1
+    assert calculate_solar_pv_economics_batch(**{**inputs, "self_consumption_rate": value - 0.01})["npv"] > 0
+
+    value, maximum = break_even_limit(INPUTS, "system_cost")
+    assert maximum and value > INPUTS["system_cost"]
+
+
+def test_limit_is_nan_if_no_value_breaks_even():
+    value, _ = break_even_limit({**INPUTS, "system_cost": 1e6}, "self_consumption_rate")
+    assert np.isnan(value)
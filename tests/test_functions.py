@@ -0,0 +1,36 @@
+import warnings
+
+import numpy as np
+import numpy_financial as npf
+import pytest
+
+from src.functions import format_german_array, format_german_nb
+from src.lifetime import simulate_lifetime
+
+
+INPUTS = {
+    "system_cost": 10000, "subsidy": 0, "pv_power": 10, "annual_electricity_production": 10000,
+    "electricity_rate": 0.15, "feed_in_tarif": 0.1, "interest_rate": 0.05, "depreciation_period": 40,
+    "self_consumption_rate": 0.3, "start_year": 2024,
+}
+
+
+def test_monthly_irr_of_long_series_with_negative_months():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        e = simulate_lifetime({**INPUTS, "resolution": "1M"}, om_cost=600)
+
+    cash_flows = e.net_cash_flows.sum(axis=1).to_numpy()
+    assert (cash_flows[1:] < 0).sum() > 40  # winter months
+    assert np.isclose(e.irr, (1 + npf.irr(cash_flows)) ** 12 - 1)
+    assert abs(e.irr - simulate_lifetime({**INPUTS, "resolution": "1Y"}, om_cost=600).irr) < 0.01
+
+
+@pytest.mark.parametrize("decimal", [0, 1, 2])
+def test_format_german_array_equals_format_german_nb(decimal):
+    rng = np.random.default_rng(decimal)
+    numbers = np.concatenate([rng.normal(0, 1e6, 200), rng.uniform(-2, 2, 200), [0., -0.004, 0.5, 2.675, 999.995,
+                                                                                   1e9, -1234567.891]])
+    for unit in ("EUR", "%", ""):
+        expected = [format_german_nb(x, decimal, unit) for x in numbers]
+        assert format_german_array(numbers, decimal, unit).tolist() == expected
@@ -0,0 +1,69 @@
+import numpy as np
+import numpy_financial as npf
+
+from src.kpi import (calculate_kpis, discounted_payback_period, internal_rate_of_return, levelized_cost,
+                     net_present_value, payback_period, periodic_bracket, profitability_index)
+
+
+def _conventional_cash_flows(n_scenarios, n_periods, low=0., seed=0):
+    rng = np.random.default_rng(seed)
+    cash_flows = rng.uniform(low, 100, size=(n_scenarios, n_periods))
+    cash_flows[:, 0] = -rng.uniform(500, 5000, size=n_scenarios) * n_periods / 20
+    return cash_flows
+
+
+def test_npv_matches_numpy_financial():
+    cash_flows = _conventional_cash_flows(20, 21)
+    expected = [npf.npv(0.05, cf) for cf in cash_flows]
+    assert np.allclose(net_present_value(cash_flows, 0.05), expected)
+
+
+def test_yearly_irr_matches_numpy_financial():
+    cash_flows = _conventional_cash_flows(50, 21)
+    expected = np.array([npf.irr(cf) for cf in cash_flows])
+    irr = internal_rate_of_return(cash_flows)
+    assert np.allclose(irr[~np.isnan(expected)], expected[~np.isnan(expected)], atol=1e-8)
+
+
+def test_monthly_irr_of_long_series_matches_numpy_financial():
+    # 300 scenarios with 40 years of months (some negative) use Horner's scheme
+    cash_flows = _conventional_cash_flows(300, 481, low=-20.) / 12
+    irr = internal_rate_of_return(cash_flows, *periodic_bracket(12))
+    for i in range(0, 300, 30):
+        assert np.isclose(irr[i], npf.irr(cash_flows[i]), atol=1e-8)
+
+
+def test_irr_without_sign_change_is_nan():
+    assert np.isnan(internal_rate_of_return(np.array([-100., -10., -10.])))
+
+
+def test_payback_periods():
+    cash_flows = np.array([[-100., 40., 40., 40., 40.], [-100., 10., 10., 10., 10.]])
+    payback = payback_period(cash_flows)
+    assert np.isclose(payback[0], 2 + 20 / 40)
+    assert np.isnan(payback[1])
+
+    discounted = cash_flows[0] / 1.1 ** np.arange(5)
+    cumsum = np.cumsum(discounted)
+    expected = 3 - cumsum[3] / discounted[4]
+    assert np.isclose(discounted_payback_period(cash_flows[0], 0.1), expected)
+
+
+def test_lcoe_and_profitability_index():
+    costs = np.array([1000., 10., 10.])
+    energy = np.array([0., 100., 100.])
+    expected = npf.npv(0.05, costs) / npf.npv(0.05, energy)
+    assert np.isclose(levelized_cost(costs, energy, 0.05), expected)
+    assert np.isnan(levelized_cost(costs, np.zeros(3), 0.05))
+
+    cash_flows = np.array([-1000., 600., 600.])
+    assert np.isclose(profitability_index(cash_flows, 0.05, 1000.), 1 + npf.npv(0.05, cash_flows) / 1000)
+
+
+def test_calculate_kpis_of_a_batch_equals_single_series():
+    cash_flows = _conventional_cash_flows(5, 21)
+    batch = calculate_kpis(cash_flows, 0.05, -cash_flows[:, 0])
+    for i, cf in enumerate(cash_flows):
+        single = calculate_kpis(cf, 0.05, -cf[0])
+        for k, v in single.items():
+            assert np.allclose(batch[k][i], v, equal_nan=True), k
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from src.functions import calculate_solar_pv_economics_batch
+
+
+INPUTS = {
+    "system_cost": 10000., "subsidy": 1000., "pv_power": 10., "annual_electricity_production": 10000.,
+    "electricity_rate": 0.3, "feed_in_tarif": 0.1, "interest_rate": 0.05, "depreciation_period": 20,
+    "self_consumption_rate": 0.3, "tax_rate": 0.42,
+}
+CONTINUOUS = ("system_cost", "subsidy", "annual_electricity_production", "electricity_rate", "feed_in_tarif",
+              "interest_rate", "self_consumption_rate", "tax_rate")
+
+
+@pytest.mark.parametrize("tax_feedin_threshold", [12500, 1000])  # not taxed and taxed
+def test_sensitivities_match_finite_differences(tax_feedin_threshold):
+    inputs = {**INPUTS, "tax_feedin_threshold": tax_feedin_threshold}
+    sensitivities = calculate_solar_pv_economics_batch(**inputs, sensitivities=True)["sensitivities"]
+
+    for name in CONTINUOUS:
+        h = 1e-6 * max(abs(inputs[name]), 1.)
+        upper = calculate_solar_pv_economics_batch(**{**inputs, name: inputs[name] + h})
+        lower = calculate_solar_pv_economics_batch(**{**inputs, name: inputs[name] - h})
+        assert np.isclose(sensitivities["npv"][name], (upper["npv"] - lower["npv"]) / (2 * h), rtol=1e-4), name
+        if name != "interest_rate":
+            assert np.isclose(sensitivities["irr"][name], (upper["irr"] - lower["irr"]) / (2 * h),
+                              rtol=1e-3, atol=1e-9), name
+
+
+def test_depreciation_period_sensitivity_is_the_difference_to_one_more_year():
+    sensitivities = calculate_solar_pv_economics_batch(**INPUTS, sensitivities=True)["sensitivities"]
+    npv = [calculate_solar_pv_economics_batch(**{**INPUTS, "depreciation_period": n})["npv"] for n in (20, 21)]
+    assert np.isclose(sensitivities["npv"]["depreciation_period"], npv[1] - npv[0])
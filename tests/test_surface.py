@@ -0,0 +1,40 @@
+import numpy as np
+
+from src.surface import build_response_surface, _evaluate
+
+
+GRID = {
+    "pv_power": np.linspace(1, 30, 15),
+    "self_consumption_rate": np.linspace(0, 1, 11),
+    "electricity_rate": np.linspace(0.05, 0.60, 12),
+}
+
+
+def test_error_bounds_hold_at_random_points(tmp_path):
+    surface = build_response_surface(str(tmp_path), grid=GRID)
+    rng = np.random.default_rng(0)
+    points = [rng.uniform(g[0], g[-1], 20000) for g in surface.grid]
+    points = [p[np.asarray(surface.smooth_cells[surface.cell(*points)])] for p in points]
+
+    exact = dict(zip(surface.kpis, _evaluate(surface.base_inputs, *points)))
+    approximation = surface.interpolate(*points)
+    bounds = surface.error_bounds(*points)
+
+    for kpi in surface.kpis:
+        approximated = np.isfinite(bounds[kpi])
+        assert approximated.mean() > 0.5
+        deviation = np.abs(exact[kpi] - approximation[kpi])[approximated]
+        assert np.all(deviation <= bounds[kpi][approximated]), kpi
+
+
+def test_approximate_returns_bounds_of_the_cell(tmp_path):
+    surface = build_response_surface(str(tmp_path), grid=GRID)
+    inputs = {**surface.base_inputs, "pv_power": 10, "self_consumption_rate": 0.3, "electricity_rate": 0.3,
+              "inverter_replacement_year": 12, "inverter_replacement_cost": 0}
+    inputs["annual_electricity_production"] = inputs.pop("annual_fullload_hours") * inputs["pv_power"]
+
+    kpis, bounds = surface.approximate(inputs)
+    exact = _evaluate(surface.base_inputs, 10, 0.3, 0.3)
+    for kpi, value in zip(surface.kpis, exact):
+        assert abs(kpis[kpi] - value) <= bounds[kpi]
+        assert bounds[kpi] <= surface.max_error_bounds[kpi]
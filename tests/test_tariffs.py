@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from src.tariffs import yearly_revenues
+
+
+def _write_prices(path, value):
+    index = pd.date_range("2023-01-01", periods=8760, freq="h")
+    pd.DataFrame({"price": np.full(8760, value)}, index=index).to_csv(path, sep=";", decimal=",")
+    return str(path)
+
+
+def test_feed_in_and_import_prices_in_different_units(tmp_path):
+    spot = _write_prices(tmp_path / "spot.csv", 80.)  # EUR/MWh
+    retail = _write_prices(tmp_path / "retail.csv", 0.3)  # EUR/kWh
+    production = np.full(8760, 1., dtype=np.float32)
+    consumption = np.full(8760, 0.5, dtype=np.float32)
+
+    revenues = yearly_revenues(production, consumption, spot, retail, n_years=2,
+                               feed_in_kwargs={"unit": "EUR/MWh"}, import_kwargs={"unit": "EUR/kWh"})
+    assert np.allclose(revenues.iloc[:, 0], 4380 * 0.3, rtol=1e-5)
+    assert np.allclose(revenues.iloc[:, 1], 4380 * 0.08, rtol=1e-5)
+
+    # a dynamic tariff uses the arguments of the feed-in prices for the import prices
+    revenues = yearly_revenues(production, consumption, spot, n_years=2, feed_in_kwargs={"unit": "EUR/MWh"})
+    assert np.allclose(revenues.iloc[:, 0], 4380 * 0.08, rtol=1e-5)